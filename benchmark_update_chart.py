@@ -0,0 +1,169 @@
+"""
+updateChartの描画時間ベンチマーク
+合成データ（graph_tests/synthetic.py）を件数ごとに投入し、期間ごとの
+updateChart(days)の時間・メインスレッドのロングタスク・JSヒープをJSONレポートに書く
+
+  python benchmark_update_chart.py --sizes 1000 10000 100000 --repeat 5 \
+      --output graph_tests/results/update_chart_benchmark.json --baseline 前回のレポート.json
+
+レポートのresultsは「件数/期間」のkeyで並ぶので、コミット間で同じkeyを比べれば推移がわかる。
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from browser_pool import start_browser
+from graph_check_helpers import APP_URL
+from graph_probe import run_probe
+from graph_tests.datasets import PERIODS
+from graph_tests.synthetic import entries_for_count
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+REPORT_VERSION = 1
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_OUTPUT = "graph_tests/results/update_chart_benchmark.json"
+
+
+def stats(values):
+    """中央値・最小・最大と各回の値（Noneは除く、値がなければNone）"""
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {
+        "median": round(statistics.median(values), 2),
+        "min": round(min(values), 2),
+        "max": round(max(values), 2),
+        "runs": [round(value, 2) for value in values],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(size, days, entries):
+    """同じ件数・期間の複数回の計測をまとめる"""
+    long_tasks = [entry["longTasks"] for entry in entries if entry.get("longTasks")]
+    heaps = [entry["heap"] for entry in entries if entry.get("heap")]
+    last = entries[-1]
+    return {
+        "key": f"{size}/{days}",
+        "entries": size,
+        "days": days,
+        "errors": sorted({entry["error"] for entry in entries if entry["error"]}),
+        "wallMs": stats(entry["elapsedMs"] for entry in entries),
+        "settledMs": stats(entry["settledMs"] for entry in entries),
+        "longTasks": {
+            "count": stats(task["count"] for task in long_tasks),
+            "totalMs": stats(task["totalMs"] for task in long_tasks),
+            "maxMs": stats(task["maxMs"] for task in long_tasks),
+        } if long_tasks else None,
+        "heapBytes": {
+            "after": stats(heap["after"] for heap in heaps),
+            "delta": stats(heap["after"] - heap["before"] for heap in heaps
+                           if heap["after"] is not None and heap["before"] is not None),
+        } if heaps else None,
+        # 結果が変わっていないかの確認用
+        "datasets": [(ds["label"], ds["dataCount"]) for ds in last["datasets"]],
+    }
+
+
+def run_benchmark(driver, sizes, periods, repeat, entries_per_day, seed, timeout):
+    results = []
+    for size in sizes:
+        print(f"\n📊 {size}件のデータで計測...")
+        data = entries_for_count(size, entries_per_day, seed=seed)
+        # データ投入を兼ねた1回目はウォームアップとして捨てる
+        run_probe(driver, periods, data=data, timeout=timeout)
+        runs = [run_probe(driver, periods, measure=True, timeout=timeout)["periods"]
+                for _ in range(repeat)]
+        for index, days in enumerate(periods):
+            result = summarize(size, days, [run[index] for run in runs])
+            results.append(result)
+            wall = result["wallMs"]["median"]
+            tasks = result["longTasks"]["count"]["median"] if result["longTasks"] else "-"
+            print(f"  {days:>3}日: updateChart {wall:8.2f}ms  ロングタスク {tasks}")
+    return results
+
+
+def compare(report, baseline):
+    """前回のレポートと中央値を比べて表示する"""
+    previous = {result["key"]: result for result in baseline.get("results", [])}
+    print(f"\n📈 前回（{(baseline.get('environment') or {}).get('commit') or '不明'}）との比較:")
+    for result in report["results"]:
+        before = previous.get(result["key"])
+        if not before or not before.get("wallMs") or not result["wallMs"]:
+            continue
+        old, new = before["wallMs"]["median"], result["wallMs"]["median"]
+        ratio = new / old if old else float("inf")
+        mark = "⚠️" if ratio > 1.2 else "✅"
+        print(f"  {mark} {result['key']:>12}: {old:8.2f}ms → {new:8.2f}ms ({ratio:.2f}倍)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="updateChartの描画時間ベンチマーク")
+    parser.add_argument("--url", default=APP_URL, help="アプリのURL")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="投入する件数")
+    parser.add_argument("--periods", type=int, nargs="+", default=PERIODS, help="計測する期間（日数、0=全期間）")
+    parser.add_argument("--repeat", type=int, default=3, help="期間ごとの計測回数")
+    parser.add_argument("--per-day", type=int, default=2, help="合成データの1日の測定回数")
+    parser.add_argument("--seed", type=int, default=0, help="合成データのシード")
+    parser.add_argument("--timeout", type=float, default=300, help="1回の計測のタイムアウト（秒）")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="レポートの出力先")
+    parser.add_argument("--baseline", help="比較する前回のレポート")
+    parser.add_argument("--headed", action="store_true", help="画面付きでChromeを起動する")
+    args = parser.parse_args()
+
+    print("=== updateChart ベンチマーク ===")
+    driver = start_browser(args.url, headless=not args.headed, data=[], timezone="UTC")
+    try:
+        results = run_benchmark(driver, args.sizes, args.periods, args.repeat,
+                                args.per_day, args.seed, args.timeout)
+        environment = {
+            "commit": git_commit(),
+            "browserVersion": driver.capabilities.get("browserVersion"),
+            "userAgent": driver.execute_script("return navigator.userAgent"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "headless": not args.headed,
+        }
+    finally:
+        driver.quit()
+
+    report = {
+        "benchmark": "updateChart",
+        "version": REPORT_VERSION,
+        "createdAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment,
+        "config": {
+            "url": args.url,
+            "sizes": args.sizes,
+            "periods": args.periods,
+            "repeat": args.repeat,
+            "entriesPerDay": args.per_day,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n💾 レポート保存: {output}")
+
+    if args.baseline:
+        compare(report, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+体重グラフ確認用ブラウザセッションプール
+起動・ログイン・体重タブ初期化を一度だけ行い、状態を戻したウォーム済みセッションを貸し出す
+"""
+
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from graph_check_helpers import (
+    APP_URL, open_app, simulate_login, wait_for_popup, wait_for_login, show_weight_tab,
+    init_weight_tab, install_chart_hook,
+)
+
+# GRAPH_CHECK_HEADLESS=1 でスクリプトもヘッドレスで起動する
+HEADLESS = os.environ.get("GRAPH_CHECK_HEADLESS", "0") == "1"
+
+# setup=などで差し替えられうるグラフ描画関数（リセット時に起動直後のものへ戻す）
+CHART_FUNCTIONS = ["updateChart", "updateChartWithOffset", "updateChartRange"]
+
+# 起動直後の体重データと描画関数を基準として保存し、リセット時に戻す
+SAVE_BASELINE_SCRIPT = """
+window.__baselineWeightData = JSON.parse(JSON.stringify(window.WeightTab.allWeightData || []));
+window.__baselineChartFunctions = {};
+arguments[0].forEach(name => { window.__baselineChartFunctions[name] = window[name]; });
+"""
+
+# グラフ関連の状態だけを戻す（ページの再読み込みはしない）
+RESET_SCRIPT = """
+const data = arguments[0];
+window.periodOffset = 0;
+window.currentDisplayDays = 30;
+window.WeightTab.allWeightData = JSON.parse(JSON.stringify(
+    data === null ? (window.__baselineWeightData || []) : data));
+Object.entries(window.__baselineChartFunctions || {}).forEach(([name, fn]) => { window[name] = fn; });
+"""
+
+
+def chrome_options(headless=HEADLESS):
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--window-size=1280,900")
+    # performance.memoryを丸めずに返す（ベンチマークのヒープ計測用）
+    options.add_argument("--enable-precise-memory-info")
+    options.set_capability("goog:loggingPrefs", {"browser": "ALL"})
+    return options
+
+
+def manual_login(driver):
+    """Googleログインボタンを押し、手動ログインの完了を待つ"""
+    try:
+        driver.find_element(By.XPATH, "//button[contains(., 'Google')]").click()
+        if wait_for_popup(driver):
+            driver.switch_to.window(driver.window_handles[0])
+    except Exception:
+        print("⚠️ ログインボタンが見つかりません")
+    print("ℹ️ 手動でGoogleログインを完了してください（完了を自動検出します）")
+    wait_for_login(driver)
+
+
+def start_browser(url=APP_URL, headless=HEADLESS, manual=False, data=None, timezone=None):
+    """ブラウザを起動し、ログインと体重タブの初期化まで済ませて返す
+
+    既定ではログイン状態をシミュレートする（人手の操作なし）。manual=Trueなら
+    実際のGoogleログインを待つ。dataを渡すとWeightTab.allWeightDataに入れて
+    リセット時の基準にする。timezoneを渡すとブラウザのタイムゾーンを固定する。
+    """
+    driver = webdriver.Chrome(options=chrome_options(headless))
+    try:
+        if timezone:
+            driver.execute_cdp_cmd("Emulation.setTimezoneOverride", {"timezoneId": timezone})
+        open_app(driver, url)
+        if manual:
+            manual_login(driver)
+        else:
+            simulate_login(driver)
+        show_weight_tab(driver)
+        init_weight_tab(driver)
+        if data is not None:
+            driver.execute_script("window.WeightTab.allWeightData = arguments[0];", data)
+        driver.execute_script(SAVE_BASELINE_SCRIPT, CHART_FUNCTIONS)
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+
+def reset_session(driver, data=None):
+    """グラフ関連の状態と差し替えられた描画関数を起動直後に戻す（dataを渡すとそのデータにする）"""
+    driver.execute_script(RESET_SCRIPT, data)
+    install_chart_hook(driver)
+    # 前の利用者のコンソールログを捨てる
+    driver.get_log("browser")
+
+
+class SessionPool:
+    """ウォーム済みブラウザのプール
+
+    with pool.session() as driver: で状態を戻したセッションを借り、抜けると返却する。
+    ブラウザは最初にまとめて並列に起動する。
+    """
+
+    def __init__(self, size=1, **options):
+        self._idle = queue.Queue()
+        self._drivers = []
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            futures = [executor.submit(start_browser, **options) for _ in range(size)]
+            try:
+                for future in futures:
+                    self._drivers.append(future.result())
+            except Exception:
+                for future in futures:
+                    if future.exception() is None:
+                        future.result().quit()
+                raise
+        for driver in self._drivers:
+            self._idle.put(driver)
+
+    @contextmanager
+    def session(self, data=None, timeout=None):
+        driver = self._idle.get(timeout=timeout)
+        try:
+            reset_session(driver, data)
+            yield driver
+        finally:
+            self._idle.put(driver)
+
+    def close(self):
+        for driver in self._drivers:
+            driver.quit()
+        self._drivers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
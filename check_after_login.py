@@ -2,44 +2,26 @@
 ログイン後の体重グラフ確認
 """
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-import time
 import sys
 
+from browser_pool import start_browser
+from graph_check_helpers import render_chart, hold_for_viewing
+from graph_tests.datasets import DATASETS, build_entries
+
 sys.stdout.reconfigure(encoding='utf-8')
 
-def check_after_login():
-    driver = webdriver.Chrome()
+def check_after_login(manual=False):
+    # 既定はログイン状態をシミュレート、--manual-login で実際のGoogleログインを待つ
+    print("📊 アプリケーションを開いています（ログイン・体重タブ初期化込み）...")
+    if manual:
+        print("ℹ️ 手動でGoogleログインを完了してください（完了を自動検出します）")
+        driver = start_browser(manual=True)
+    else:
+        # シミュレート時はFirebaseのデータがないので、複数測定の日を含むテストデータを入れる
+        driver = start_browser(data=build_entries(DATASETS["mixed"]))
     
     try:
-        print("📊 アプリケーションを開いています...")
-        driver.get("http://localhost:8080")
-        time.sleep(3)
-        
-        # Googleログインボタンをクリック
-        print("\n🔐 ログイン処理...")
-        try:
-            login_btn = driver.find_element(By.XPATH, "//button[contains(., 'Google')]")
-            login_btn.click()
-            print("✅ Googleログインボタンをクリック")
-            
-            # 新しいウィンドウが開く場合の処理
-            time.sleep(2)
-            windows = driver.window_handles
-            if len(windows) > 1:
-                print("ℹ️ ログインウィンドウが開きました")
-                # メインウィンドウに戻る
-                driver.switch_to.window(windows[0])
-        except:
-            print("⚠️ ログインボタンが見つかりません")
-        
-        # ログイン後の画面を待つ
-        print("\n⏳ ログイン処理を待機中...")
-        print("ℹ️ 手動でGoogleログインを完了してください")
-        print("ℹ️ ログイン完了後、Enterキーを押してください...")
-        input()
-        
         # タブボタンを探す
         print("\n🔍 タブボタンを探しています...")
         buttons = driver.find_elements(By.TAG_NAME, "button")
@@ -48,11 +30,6 @@ def check_after_login():
             if text:
                 print(f"  - ボタン: '{text}'")
         
-        # JavaScriptでタブ表示
-        print("\n📊 体重タブを表示...")
-        driver.execute_script("showTab(1)")
-        time.sleep(2)
-        
         # WeightTabオブジェクトの確認
         js_check = """
         return {
@@ -69,22 +46,9 @@ def check_after_login():
         
         # グラフ更新を実行
         print("\n📊 グラフ更新を実行...")
-        driver.execute_script("updateChart(30)")
-        time.sleep(2)
+        datasets = render_chart(driver, 30)['datasets']
         
         # データセット確認
-        datasets_script = """
-        if (window.WeightTab && window.WeightTab.weightChart) {
-            return window.WeightTab.weightChart.data.datasets.map(ds => ({
-                label: ds.label,
-                dataCount: ds.data.length,
-                borderDash: ds.borderDash || []
-            }));
-        }
-        return null;
-        """
-        datasets = driver.execute_script(datasets_script)
-        
         if datasets:
             print(f"\n📊 データセット情報:")
             for ds in datasets:
@@ -95,10 +59,7 @@ def check_after_login():
         periods = [1, 7, 30, 90, 365, 0]
         for days in periods:
             print(f"\n🔄 {days}日表示をテスト...")
-            driver.execute_script(f"updateChart({days})")
-            time.sleep(1)
-            
-            datasets = driver.execute_script(datasets_script)
+            datasets = render_chart(driver, days)['datasets']
             if datasets:
                 print(f"  データセット数: {len(datasets)}")
                 for ds in datasets:
@@ -108,7 +69,7 @@ def check_after_login():
         driver.save_screenshot("weight_graph_after_login.png")
         print("\n📸 スクリーンショット保存: weight_graph_after_login.png")
         
-        input("\n⏸️ Enterキーを押すと終了します...")
+        hold_for_viewing()
         
     except Exception as e:
         print(f"\n❌ エラー: {str(e)}")
@@ -118,4 +79,4 @@ def check_after_login():
         driver.quit()
 
 if __name__ == "__main__":
-    check_after_login()
\ No newline at end of file
+    check_after_login(manual="--manual-login" in sys.argv)
\ No newline at end of file
@@ -2,41 +2,25 @@
 体重グラフの動作確認スクリプト
 """
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-import json
 import sys
 
+from browser_pool import start_browser
+from graph_check_helpers import (
+    wait_for_weight_tab, click_and_wait_render, chart_datasets, hold_for_viewing,
+)
+from graph_tests.datasets import DATASETS, build_entries
+
 # UTF-8エンコーディングを設定
 sys.stdout.reconfigure(encoding='utf-8')
 
 def check_weight_graph():
-    # ChromeDriverを起動
-    driver = webdriver.Chrome()
+    # ログイン状態をシミュレートし、体重タブの初期化まで済ませたChromeを起動
+    # （Firebaseのデータがないので、複数測定の日を含むテストデータを入れる）
+    print("📊 体重管理アプリを開いています...")
+    driver = start_browser(data=build_entries(DATASETS["mixed"]))
     
     try:
-        print("📊 体重管理アプリを開いています...")
-        driver.get("http://localhost:8080")
-        
-        # ページが読み込まれるまで待機
-        time.sleep(3)
-        
-        # ログイン処理（必要な場合）
-        try:
-            # ログインダイアログの確認
-            login_dialog = driver.find_element(By.CLASS_NAME, "auth-modal")
-            if login_dialog.is_displayed():
-                # デモモードボタンを探す
-                demo_btn = driver.find_element(By.XPATH, "//button[contains(., 'デモ') or contains(., 'Demo')]")
-                demo_btn.click()
-                print("✅ デモモードでログイン")
-                time.sleep(2)
-        except:
-            print("ℹ️ ログイン画面をスキップ")
-        
         # 体重タブをクリック（様々なセレクタを試す）
         try:
             # タブボタンを探す
@@ -67,7 +51,7 @@ def check_weight_graph():
             if weight_tab:
                 weight_tab.click()
                 print("✅ 体重タブを開きました")
-                time.sleep(2)
+                wait_for_weight_tab(driver)
             else:
                 print("❌ 体重タブが見つかりません")
                 return
@@ -95,9 +79,8 @@ def check_weight_graph():
         for btn_text, period_name in periods:
             try:
                 btn = driver.find_element(By.XPATH, f"//button[contains(text(), '{btn_text}')]")
-                btn.click()
                 print(f"\n📊 {period_name}表示をテスト中...")
-                time.sleep(2)
+                click_and_wait_render(driver, btn)
                 
                 # コンソールログを確認
                 logs = driver.get_log('browser')
@@ -106,17 +89,8 @@ def check_weight_graph():
                         print(f"  ログ: {log['message']}")
                 
                 # Chart.jsのデータセットを確認
-                datasets_script = """
-                if (window.WeightTab && window.WeightTab.weightChart) {
-                    return window.WeightTab.weightChart.data.datasets.map(ds => ({
-                        label: ds.label,
-                        dataCount: ds.data.length
-                    }));
-                } else {
-                    return null;
-                }
-                """
-                datasets = driver.execute_script(datasets_script)
+                summary = chart_datasets(driver)
+                datasets = summary['datasets'] if summary['exists'] else None
                 
                 if datasets:
                     print(f"  データセット数: {len(datasets)}")
@@ -132,9 +106,8 @@ def check_weight_graph():
         driver.save_screenshot("weight_graph_check.png")
         print("\n📸 スクリーンショットを保存しました: weight_graph_check.png")
         
-        # 10秒間開いたままにする
-        print("\n⏳ 10秒後に自動で閉じます...")
-        time.sleep(10)
+        # 確認用に開いたままにする（GRAPH_CHECK_HOLD秒）
+        hold_for_viewing()
         
     except Exception as e:
         print(f"❌ エラーが発生しました: {str(e)}")
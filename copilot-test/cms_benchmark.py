@@ -0,0 +1,287 @@
+# Benchmarks for CustomerManagementSystem
+#
+# Usage:
+#   python cms_benchmark.py search --sizes 10000 100000 1000000
+#   python cms_benchmark.py search --sizes 100000 --storage-mode sqlite
+#   python cms_benchmark.py memory --sizes 100000 1000000
+#   python cms_benchmark.py concurrency --writers 8 16 32 --kind process
+#   python cms_benchmark.py async --clients 1 16 64 256
+#   python cms_benchmark.py durability --writes 2000
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from customer_management_system import AsyncCustomerManagementSystem, CompactCustomerStore, CustomerManagementSystem
+
+FIRST_NAMES = ["John", "Jane", "Taro", "Hanako", "Maria", "Wei", "Olga", "Ahmed", "Lucia", "Kenji"]
+LAST_NAMES = ["Doe", "Smith", "Yamada", "Suzuki", "Garcia", "Chen", "Ivanova", "Khan", "Rossi", "Sato"]
+DOMAINS = ["example.com", "mail.test", "corp.example", "shop.test"]
+CITIES = ["Tokyo", "Osaka", "Berlin", "Paris", "Austin", "Lima", "Cairo", "Seoul"]
+
+
+def make_customers(count, seed=0):
+    rng = random.Random(seed)
+    customers = []
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        customers.append({
+            "id": i,
+            "name": "{} {} {}".format(first, last, i),
+            "email": "{}.{}{}@{}".format(first.lower(), last.lower(), i, rng.choice(DOMAINS)),
+            "city": rng.choice(CITIES),
+        })
+    return customers
+
+
+@contextmanager
+def workspace():
+    # CustomerManagementSystem writes config.json and cms.log into the
+    # working directory, so every benchmark runs inside a scratch directory.
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(cwd)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def open_cms(customers, **kwargs):
+    with open("customers.json", "w") as file:
+        json.dump(customers, file)
+    start = time.perf_counter()
+    cms = CustomerManagementSystem(**kwargs)
+    return cms, time.perf_counter() - start
+
+
+def bench_search(args):
+    terms = ["john", "yamada12", "@shop.test", "zz-no-match", "ol"]
+    report = []
+    for size in args.sizes:
+        with workspace():
+            customers = make_customers(size)
+            cms, load_seconds = open_cms(customers, storage_mode=args.storage_mode)
+            row = {"size": size, "storage_mode": args.storage_mode, "load_seconds": round(load_seconds, 4),
+                   "queries": []}
+            for term in terms:
+                indexed, results = timed(lambda: cms.search_customers(term), args.repeat)
+                scan, expected = timed(lambda: [c for c in customers
+                                                if term in c["name"].lower() or term in c["email"].lower()],
+                                       args.repeat)
+                assert len(results) == len(expected), term
+                row["queries"].append({
+                    "term": term,
+                    "results": len(results),
+                    "indexed_ms": round(indexed * 1000, 3),
+                    "scan_ms": round(scan * 1000, 3),
+                })
+            report.append(row)
+            print("{:>9} records  {}  load {:.2f}s".format(size, args.storage_mode, load_seconds))
+            for query in row["queries"]:
+                print("    {term!r:<16} {results:>8} hits  indexed {indexed_ms:>9.3f} ms  scan {scan_ms:>9.3f} ms".format(**query))
+    return report
+
+
+def measure_store(path, make_store):
+    tracemalloc.start()
+    try:
+        with open(path) as file:
+            records = json.load(file)
+        store = make_store()
+        for record in records:
+            store[record["id"]] = record
+        del records
+        return tracemalloc.get_traced_memory()[0], store
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(args):
+    report = []
+    for size in args.sizes:
+        with workspace():
+            with open("customers.json", "w") as file:
+                json.dump(make_customers(size), file)
+            dict_bytes, _ = measure_store("customers.json", dict)
+            compact_bytes, store = measure_store("customers.json", lambda: CompactCustomerStore(["city"]))
+            assert len(store) == size
+            row = {
+                "size": size,
+                "dict_bytes_per_record": round(dict_bytes / size, 1),
+                "compact_bytes_per_record": round(compact_bytes / size, 1),
+                "saving": round(1 - compact_bytes / dict_bytes, 3),
+            }
+            report.append(row)
+            print("{size:>9} records  dict {dict_bytes_per_record:>7.1f} B/rec  "
+                  "compact {compact_bytes_per_record:>7.1f} B/rec  saving {saving:.1%}".format(**row))
+    return report
+
+
+def write_customers(worker, count, storage_mode, concurrency):
+    cms = CustomerManagementSystem(storage_mode=storage_mode, concurrency=concurrency)
+    for customer in make_customers(count, seed=worker):
+        customer["id"] = "{}-{}".format(worker, customer["id"])
+        cms.add_customer(customer)
+
+
+def bench_concurrency(args):
+    report = []
+    for writers in args.writers:
+        with workspace():
+            if args.kind == "thread":
+                cms = CustomerManagementSystem(storage_mode=args.storage_mode, concurrency="thread")
+                workers = [threading.Thread(target=lambda w=w: [
+                    cms.add_customer(dict(c, id="{}-{}".format(w, c["id"])))
+                    for c in make_customers(args.per_writer, seed=w)]) for w in range(writers)]
+            else:
+                workers = [multiprocessing.Process(target=write_customers,
+                                                   args=(w, args.per_writer, args.storage_mode, "process"))
+                           for w in range(writers)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            stored = len(CustomerManagementSystem(storage_mode=args.storage_mode).customers)
+            expected = writers * args.per_writer
+            row = {
+                "kind": args.kind,
+                "storage_mode": args.storage_mode,
+                "writers": writers,
+                "writes": expected,
+                "stored": stored,
+                "seconds": round(elapsed, 3),
+                "writes_per_second": round(expected / elapsed, 1),
+            }
+            report.append(row)
+            print("{writers:>3} {kind} writers  {writes:>7} writes  {stored:>7} stored  "
+                  "{seconds:>8.3f}s  {writes_per_second:>10.1f} writes/s".format(**row))
+            assert stored == expected, "lost writes"
+    return report
+
+
+async def run_async_clients(clients, requests, storage_mode):
+    async with await AsyncCustomerManagementSystem.create(storage_mode=storage_mode) as cms:
+        customers = make_customers(clients * requests)
+
+        async def client(offset):
+            for customer in customers[offset::clients]:
+                await cms.add_customer(customer)
+                await cms.get_customer(customer["id"])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(offset) for offset in range(clients)))
+        return time.perf_counter() - start
+
+
+def bench_async(args):
+    report = []
+    for clients in args.clients:
+        with workspace():
+            elapsed = asyncio.run(run_async_clients(clients, args.requests, args.storage_mode))
+            total = clients * args.requests * 2
+            row = {
+                "storage_mode": args.storage_mode,
+                "clients": clients,
+                "requests": total,
+                "seconds": round(elapsed, 3),
+                "requests_per_second": round(total / elapsed, 1),
+            }
+            report.append(row)
+            print("{clients:>4} clients  {requests:>7} requests  {seconds:>8.3f}s  "
+                  "{requests_per_second:>10.1f} req/s".format(**row))
+    return report
+
+
+def bench_durability(args):
+    report = []
+    for storage_mode in args.storage_modes:
+        for durability in ("sync", "group-commit", "on-close"):
+            with workspace():
+                customers = make_customers(args.writes)
+                cms = CustomerManagementSystem(storage_mode=storage_mode, durability=durability)
+                latencies = []
+                start = time.perf_counter()
+                for customer in customers:
+                    started = time.perf_counter()
+                    cms.add_customer(customer)
+                    latencies.append(time.perf_counter() - started)
+                cms.close()
+                elapsed = time.perf_counter() - start
+                stored = len(CustomerManagementSystem(storage_mode=storage_mode).customers)
+                latencies.sort()
+                row = {
+                    "storage_mode": storage_mode,
+                    "durability": durability,
+                    "writes": args.writes,
+                    "stored": stored,
+                    "seconds": round(elapsed, 3),
+                    "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+                    "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+                }
+                report.append(row)
+                print("{storage_mode:<8} {durability:<13} {writes:>7} writes  {seconds:>8.3f}s  "
+                      "p50 {p50_us:>9.1f} us  p99 {p99_us:>10.1f} us".format(**row))
+                assert stored == args.writes, "lost writes"
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CustomerManagementSystem benchmarks")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="n-gram (sqlite: FTS5 trigram) indexed search vs. full scan")
+    search.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    search.add_argument("--repeat", type=int, default=5)
+    search.add_argument("--storage-mode", choices=["json", "journal", "lazy", "sqlite"], default="json")
+    search.set_defaults(func=bench_search)
+
+    memory = subparsers.add_parser("memory", help="dict records vs. CompactCustomerStore footprint")
+    memory.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    memory.set_defaults(func=bench_memory)
+
+    concurrency = subparsers.add_parser("concurrency", help="write throughput under concurrent writers")
+    concurrency.add_argument("--writers", type=int, nargs="+", default=[8, 16, 32])
+    concurrency.add_argument("--per-writer", type=int, default=500)
+    concurrency.add_argument("--kind", choices=["thread", "process"], default="thread")
+    concurrency.add_argument("--storage-mode", choices=["json", "journal", "lazy", "sqlite"], default="journal")
+    concurrency.set_defaults(func=bench_concurrency)
+
+    async_ = subparsers.add_parser("async", help="AsyncCustomerManagementSystem requests/s under concurrent clients")
+    async_.add_argument("--clients", type=int, nargs="+", default=[1, 16, 64, 256])
+    async_.add_argument("--requests", type=int, default=50, help="add+get pairs per client")
+    async_.add_argument("--storage-mode", choices=["json", "journal", "lazy", "sqlite"], default="json")
+    async_.set_defaults(func=bench_async)
+
+    durability = subparsers.add_parser("durability", help="per-write latency for each durability mode")
+    durability.add_argument("--writes", type=int, default=2000)
+    durability.add_argument("--storage-modes", nargs="+", choices=["json", "journal"], default=["json", "journal"])
+    durability.set_defaults(func=bench_durability)
+
+    args = parser.parse_args()
+    report = {"benchmark": args.command, "results": args.func(args)}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,1077 @@
 # Customer Management System
+import asyncio
+import csv
+import functools
+import hashlib
+import io
 import logging
+import mmap
 import os
 import json
+import random
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+STORAGE_MODES = ("json", "journal", "lazy", "sqlite")
+CONCURRENCY_MODES = (None, "thread", "process")
+DURABILITY_MODES = ("sync", "group-commit", "on-close")
+# Modes whose record store writes to disk itself rather than via save_data.
+SELF_PERSISTING_MODES = ("lazy", "sqlite")
+REPORT_FORMATS = ("text", "ndjson", "csv")
+SEARCH_FIELDS = ("name", "email")
+NGRAM_SIZE = 3
+
+
+def ngrams(text, size=NGRAM_SIZE):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def write_json_atomic(path, data, indent=None):
+    # Write to a sibling temp file and rename over the target so readers
+    # never observe a half-written document. The temp name is per process
+    # so concurrent writers of the same file do not share it.
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, indent=indent, separators=None if indent else (",", ":"))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def unique_by_id(customers):
+    # Keeps one record per id: the last copy, at the first copy's position,
+    # as replaying the records through add_customer would. Dropped copies
+    # are logged, since the next save makes the loss permanent.
+    by_id = {}
+    dropped = []
+    for customer in customers:
+        if customer["id"] in by_id:
+            dropped.append(customer["id"])
+        by_id[customer["id"]] = customer
+    if dropped:
+        logging.warning("Dropped %d duplicate customer records (the last copy of each id is kept); ids: %s",
+                        len(dropped), sorted(set(dropped), key=repr))
+    return list(by_id.values())
+
+
+class CustomerJournal:
+    # Append-only log of customer mutations, one JSON object per line.
+    # Entries are replayed on top of the snapshot in storage_file and the
+    # log is truncated whenever a new snapshot is written.
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.pending = 0
+        self.offset = 0
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        data = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+        with open(self.path, "ab") as file:
+            file.write(data.encode())
+            if self.fsync:
+                file.flush()
+                os.fsync(file.fileno())
+            self.offset = file.tell()
+        self.pending += len(entries)
+
+    def read_from(self, offset):
+        # Entries appended (by another process) after offset, up to the
+        # last complete line.
+        entries = []
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            for raw in file:
+                if not raw.endswith(b"\n"):
+                    break
+                entries.append(json.loads(raw))
+                offset += len(raw)
+        self.offset = offset
+        self.pending += len(entries)
+        return entries
+
+    def replay(self, customers):
+        # Replay is idempotent per id (add is an upsert, remove/update of a
+        # missing id is a no-op), so a crash between writing a snapshot and
+        # truncating the journal does not duplicate records.
+        self.pending = 0
+        self.offset = 0
+        if not os.path.exists(self.path):
+            return customers
+        by_id = {c["id"]: c for c in customers}
+        good_offset = 0
+        with open(self.path, "rb") as file:
+            for raw in file:
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    break
+                if not raw.endswith(b"\n"):
+                    break
+                self._apply(by_id, entry)
+                good_offset += len(raw)
+                self.pending += 1
+        if good_offset < os.path.getsize(self.path):
+            logging.warning("Discarding torn journal tail in %s at byte %d.", self.path, good_offset)
+            with open(self.path, "r+b") as file:
+                file.truncate(good_offset)
+        self.offset = good_offset
+        return list(by_id.values())
+
+    def truncate(self):
+        with open(self.path, "w"):
+            pass
+        self.pending = 0
+        self.offset = 0
+
+    @staticmethod
+    def _apply(by_id, entry):
+        op = entry.get("op")
+        if op == "add":
+            customer = entry["customer"]
+            by_id.pop(customer["id"], None)
+            by_id[customer["id"]] = customer
+        elif op == "remove":
+            by_id.pop(entry["id"], None)
+        elif op == "update":
+            customer = by_id.get(entry["id"])
+            if customer is not None:
+                customer.update(entry["data"])
+                if customer["id"] != entry["id"]:
+                    del by_id[entry["id"]]
+                    by_id[customer["id"]] = customer
+        else:
+            logging.warning("Skipping unknown journal entry: %s", op)
+
+
+class CompactCustomerStore(MutableMapping):
+    # id -> customer mapping that keeps each record as a tuple laid out by
+    # a shared field schema instead of a dict per customer. String values
+    # of interned_fields (e.g. city, status) are deduplicated via
+    # sys.intern. Lookups return a freshly built dict, so changes to a
+    # returned record only take effect once it is stored again.
+
+    _MISSING = object()
+
+    def __init__(self, interned_fields=()):
+        self._fields = []
+        self._positions = {}
+        self._interned = frozenset(interned_fields)
+        self._rows = {}
+
+    def _pack(self, customer):
+        positions = self._positions
+        for field in customer:
+            if field not in positions:
+                positions[field] = len(self._fields)
+                self._fields.append(field)
+        row = [self._MISSING] * len(self._fields)
+        for field, value in customer.items():
+            if field in self._interned and type(value) is str:
+                value = sys.intern(value)
+            row[positions[field]] = value
+        while row and row[-1] is self._MISSING:
+            row.pop()
+        return tuple(row)
+
+    def _unpack(self, row):
+        missing = self._MISSING
+        return {field: value for field, value in zip(self._fields, row) if value is not missing}
+
+    def __getitem__(self, customer_id):
+        return self._unpack(self._rows[customer_id])
+
+    def __setitem__(self, customer_id, customer):
+        self._rows[customer_id] = self._pack(customer)
+
+    def __delitem__(self, customer_id):
+        del self._rows[customer_id]
+
+    def __contains__(self, customer_id):
+        return customer_id in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def values(self):
+        return (self._unpack(row) for row in self._rows.values())
+
+    def items(self):
+        return ((customer_id, self._unpack(row)) for customer_id, row in self._rows.items())
+
+
+class LazyCustomerStore(MutableMapping):
+    # id -> customer mapping over an on-disk store that is opened in
+    # constant time and paged in on demand:
+    #
+    #   <path>      marker line, then one JSON record per line
+    #   <path>.idx  header + (id hash, offset, length) entries sorted by hash
+    #
+    # The indexed prefix of the data file holds exactly one live record per
+    # id and both files are memory-mapped. Writes append a new version (or a
+    # tombstone) past the indexed prefix; on open only that tail is scanned.
+    # compact() folds the tail back into a fresh data file and index.
+
+    MAGIC = b"CMSIDX01"
+    HEADER = struct.Struct("<8s8sQQ")
+    ENTRY = struct.Struct("<QQI")
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._data_map = None
+        self._index_map = None
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        self._open()
+
+    @staticmethod
+    def _hash(customer_id):
+        key = json.dumps(customer_id).encode()
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+    @staticmethod
+    def _encode(record):
+        return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            self.reset([])
+            return
+        with open(self.path, "rb") as file:
+            first_line = file.readline()
+        try:
+            marker = json.loads(first_line).get("__lazy_store__")
+        except (ValueError, AttributeError):
+            marker = None
+        if marker is None:
+            # Plain JSON array written by the json storage mode.
+            with open(self.path, "r") as file:
+                customers = json.load(file)
+            logging.info("Converting %s to the lazy storage format.", self.path)
+            self.reset(unique_by_id(customers))
+            return
+        self._data_id = bytes.fromhex(marker)
+        header = None
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as file:
+                raw = file.read(self.HEADER.size)
+            if len(raw) == self.HEADER.size:
+                header = self.HEADER.unpack(raw)
+        data_size = os.path.getsize(self.path)
+        if header is None or header[0] != self.MAGIC or header[1] != self._data_id or header[2] > data_size:
+            logging.warning("Index for %s is missing or stale; rebuilding.", self.path)
+            self._covered, self._indexed = data_size, 0
+            self._overlay = {}
+            self._map()
+            self.reset(self._scan_all())
+            return
+        _, _, self._covered, self._indexed = header
+        self._map()
+        self._load_tail()
+
+    def _map(self):
+        self._reader = open(self.path, "rb")
+        if self._covered:
+            self._data_map = mmap.mmap(self._reader.fileno(), self._covered, access=mmap.ACCESS_READ)
+        if self._indexed:
+            with open(self.index_path, "rb") as file:
+                self._index_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _scan_all(self):
+        # Only used to recover from a lost index: the last version of each
+        # id wins, in first-seen order.
+        latest = {}
+        self._reader.seek(0)
+        self._reader.readline()
+        for raw in self._reader:
+            if not raw.endswith(b"\n"):
+                break
+            record = json.loads(raw)
+            if "__deleted__" in record:
+                latest.pop(record["__deleted__"], None)
+            else:
+                latest[record["id"]] = record
+        return list(latest.values())
+
+    def _load_tail(self):
+        self._overlay = {}
+        self._count = self._indexed
+        offset = self._covered
+        self._reader.seek(offset)
+        for raw in self._reader:
+            if not raw.endswith(b"\n"):
+                logging.warning("Discarding torn record in %s at byte %d.", self.path, offset)
+                with open(self.path, "r+b") as file:
+                    file.truncate(offset)
+                break
+            record = json.loads(raw)
+            if "__deleted__" in record:
+                self._track(record["__deleted__"], None)
+            else:
+                self._track(record["id"], (offset, len(raw)))
+            offset += len(raw)
+
+    def _track(self, customer_id, location):
+        existed = self._locate(customer_id) is not None
+        self._overlay[customer_id] = location
+        self._count += (location is not None) - existed
+
+    def _read(self, offset, length):
+        if offset + length <= self._covered:
+            return json.loads(self._data_map[offset:offset + length])
+        with self._reader_lock:
+            self._reader.seek(offset)
+            raw = self._reader.read(length)
+        return json.loads(raw)
+
+    def _locate(self, customer_id):
+        if customer_id in self._overlay:
+            return self._overlay[customer_id]
+        if not self._indexed:
+            return None
+        target = self._hash(customer_id)
+        entry_at = lambda i: self.ENTRY.unpack_from(self._index_map, self.HEADER.size + i * self.ENTRY.size)
+        lo, hi = 0, self._indexed
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if entry_at(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._indexed:
+            key_hash, offset, length = entry_at(lo)
+            if key_hash != target:
+                break
+            if self._read(offset, length)["id"] == customer_id:
+                return offset, length
+            lo += 1
+        return None
+
+    def _append(self, record):
+        data = self._encode(record)
+        with open(self.path, "ab") as file:
+            offset = file.tell()
+            file.write(data)
+        return offset, len(data)
+
+    def __getitem__(self, customer_id):
+        location = self._locate(customer_id)
+        if location is None:
+            raise KeyError(customer_id)
+        return self._read(*location)
+
+    def __setitem__(self, customer_id, customer):
+        self._track(customer_id, self._append(customer))
+
+    def __delitem__(self, customer_id):
+        if self._locate(customer_id) is None:
+            raise KeyError(customer_id)
+        self._append({"__deleted__": customer_id})
+        self._track(customer_id, None)
+
+    def __contains__(self, customer_id):
+        return self._locate(customer_id) is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (customer_id for customer_id, _ in self.items())
+
+    def values(self):
+        return (customer for _, customer in self.items())
+
+    def items(self):
+        data = self._data_map
+        if data is not None:
+            start = data.find(b"\n") + 1
+            while start < self._covered:
+                end = data.find(b"\n", start) + 1
+                customer = json.loads(data[start:end])
+                if customer["id"] not in self._overlay:
+                    yield customer["id"], customer
+                start = end
+        for customer_id, location in list(self._overlay.items()):
+            if location is not None:
+                yield customer_id, self._read(*location)
+
+    @property
+    def tail_records(self):
+        return len(self._overlay)
+
+    def compact(self):
+        self.reset(self.values())
+
+    def reset(self, customers):
+        data_id = os.urandom(8)
+        entries = []
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            offset = file.write(self._encode({"__lazy_store__": data_id.hex()}))
+            for customer in customers:
+                data = self._encode(customer)
+                entries.append((self._hash(customer["id"]), offset, len(data)))
+                offset += file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        entries.sort()
+        with open(self.index_path + ".tmp", "wb") as file:
+            file.write(self.HEADER.pack(self.MAGIC, data_id, offset, len(entries)))
+            for entry in entries:
+                file.write(self.ENTRY.pack(*entry))
+            file.flush()
+            os.fsync(file.fileno())
+        self.close()
+        # A crash between the two renames leaves mismatched data ids, which
+        # _open() detects and repairs by rebuilding the index.
+        os.replace(tmp_path, self.path)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        self._data_id = data_id
+        self._covered, self._indexed = offset, len(entries)
+        self._overlay = {}
+        self._count = len(entries)
+        self._map()
+
+    def close(self):
+        for handle in (self._data_map, self._index_map, self._reader):
+            if handle is not None:
+                handle.close()
+        self._data_map = self._index_map = self._reader = None
+
+
+class SqliteCustomerStore(MutableMapping):
+    # id -> customer mapping persisted in a local SQLite database (WAL
+    # mode). Each record is stored as JSON next to indexed id/name/email
+    # columns, so lookups and filters run as indexed queries instead of
+    # Python scans. Substring searches go through an FTS5 trigram index
+    # over the lowercased name/email, kept in sync by triggers. Writes
+    # autocommit unless wrapped in begin()/commit(). Ids are stored
+    # JSON-encoded to keep 1 and "1" apart.
+    #
+    # Opening a JSON array written by the json storage mode converts it in
+    # place. This is one-way: the json and journal modes cannot read the
+    # database, so the original is kept as <path>.json.bak (not updated
+    # afterwards).
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS customers (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            name TEXT,
+            email TEXT,
+            name_lc TEXT,
+            email_lc TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS customers_name ON customers (name);
+        CREATE INDEX IF NOT EXISTS customers_email ON customers (email);
+    """
+    # External-content FTS5 table: it stores only the trigram postings and
+    # reads name_lc/email_lc back from customers by seq.
+    SEARCH_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS customers_search USING fts5 (
+            name_lc, email_lc, content='customers', content_rowid='seq',
+            tokenize='trigram case_sensitive 1'
+        );
+        CREATE TRIGGER IF NOT EXISTS customers_search_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_search (rowid, name_lc, email_lc) VALUES (new.seq, new.name_lc, new.email_lc);
+        END;
+        CREATE TRIGGER IF NOT EXISTS customers_search_delete AFTER DELETE ON customers BEGIN
+            INSERT INTO customers_search (customers_search, rowid, name_lc, email_lc)
+                VALUES ('delete', old.seq, old.name_lc, old.email_lc);
+        END;
+        CREATE TRIGGER IF NOT EXISTS customers_search_update AFTER UPDATE ON customers BEGIN
+            INSERT INTO customers_search (customers_search, rowid, name_lc, email_lc)
+                VALUES ('delete', old.seq, old.name_lc, old.email_lc);
+            INSERT INTO customers_search (rowid, name_lc, email_lc) VALUES (new.seq, new.name_lc, new.email_lc);
+        END;
+    """
+    UPSERT = """
+        INSERT INTO customers (id, name, email, name_lc, email_lc, data) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET name = excluded.name, email = excluded.email,
+            name_lc = excluded.name_lc, email_lc = excluded.email_lc, data = excluded.data
+    """
+    COLUMNS = {"name": "name", "email": "email"}
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as file:
+                is_sqlite = file.read(16) == b"SQLite format 3\x00"
+            if not is_sqlite:
+                with open(path, "r") as file:
+                    customers = json.load(file)
+                logging.info("Converting %s to the sqlite storage format.", path)
+                self._convert(path, unique_by_id(customers))
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._fts = self._create_search_index(self._conn)
+
+    @classmethod
+    def _create_search_index(cls, conn):
+        # Returns False when this SQLite build has no FTS5 trigram tokenizer
+        # (added in 3.34); search() then scans instead.
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'customers_search'").fetchone()
+        try:
+            conn.executescript(cls.SEARCH_SCHEMA)
+        except sqlite3.OperationalError as error:
+            logging.warning("FTS5 trigram search unavailable (%s); searches will scan.", error)
+            return False
+        if not exists:
+            # Databases written before the search index existed.
+            conn.execute("INSERT INTO customers_search (customers_search) VALUES ('rebuild')")
+        return True
+
+    @classmethod
+    def _convert(cls, path, customers):
+        # The database is built and committed at a temp path and only then
+        # renamed over the JSON file, so a failure midway loses nothing.
+        tmp_path = path + ".sqlite.tmp"
+        for stale in (tmp_path, tmp_path + "-journal"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        conn = sqlite3.connect(tmp_path, isolation_level=None)
+        try:
+            conn.executescript(cls.SCHEMA)
+            cls._create_search_index(conn)
+            conn.execute("BEGIN")
+            conn.executemany(cls.UPSERT, (cls._row(customer) for customer in customers))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        shutil.copy2(path, path + ".json.bak")
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _key(customer_id):
+        return json.dumps(customer_id)
+
+    @classmethod
+    def _row(cls, customer):
+        name, email = customer.get("name"), customer.get("email")
+        return (cls._key(customer["id"]), name, email,
+                name.lower() if isinstance(name, str) else None,
+                email.lower() if isinstance(email, str) else None,
+                json.dumps(customer, separators=(",", ":")))
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [json.loads(data) for data, in self._conn.execute(sql, params)]
+
+    def __getitem__(self, customer_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM customers WHERE id = ?", (self._key(customer_id),)).fetchone()
+        if row is None:
+            raise KeyError(customer_id)
+        return json.loads(row[0])
+
+    def __setitem__(self, customer_id, customer):
+        row = self._row(dict(customer, id=customer_id))
+        with self._lock:
+            self._conn.execute(self.UPSERT, row)
+
+    def __delitem__(self, customer_id):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM customers WHERE id = ?", (self._key(customer_id),))
+        if not cursor.rowcount:
+            raise KeyError(customer_id)
+
+    def __contains__(self, customer_id):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM customers WHERE id = ?",
+                                      (self._key(customer_id),)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+    def __iter__(self):
+        return (customer["id"] for customer in self.values())
+
+    def values(self, chunk_size=1000):
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute("SELECT seq, data FROM customers WHERE seq > ? ORDER BY seq LIMIT ?",
+                                          (last_seq, chunk_size)).fetchall()
+            if not rows:
+                return
+            for seq, data in rows:
+                yield json.loads(data)
+            last_seq = rows[-1][0]
+
+    def items(self):
+        return ((customer["id"], customer) for customer in self.values())
+
+    def search(self, term):
+        # term is already lowercased. A trigram index cannot answer terms
+        # shorter than three characters, so those scan the table, as the
+        # in-memory n-gram index does.
+        if self._fts and len(term) >= 3:
+            phrase = '"{}"'.format(term.replace('"', '""'))
+            return self._query("SELECT c.data FROM customers_search s JOIN customers c ON c.seq = s.rowid "
+                               "WHERE customers_search MATCH ? ORDER BY c.seq", (phrase,))
+        return self._query("SELECT data FROM customers WHERE instr(name_lc, ?) > 0 OR instr(email_lc, ?) > 0 "
+                           "ORDER BY seq", (term, term))
+
+    @staticmethod
+    def _path(field):
+        return "'$.\"{}\"'".format(field.replace("'", "''").replace('"', '\\"'))
+
+    def filter(self, key, value):
+        # Returns None when the value cannot be compared in SQL; the caller
+        # then falls back to a scan. Candidates are re-checked in Python so
+        # SQLite's type coercions (e.g. true == 1) cannot widen the result.
+        if isinstance(value, (dict, list)):
+            return None
+        if key == "id":
+            candidates = self._query("SELECT data FROM customers WHERE id = ?", (self._key(value),))
+        elif value is None:
+            candidates = self._query("SELECT data FROM customers WHERE json_extract(data, {}) IS NULL "
+                                     "ORDER BY seq".format(self._path(key)))
+        elif key in self.COLUMNS and isinstance(value, str):
+            candidates = self._query("SELECT data FROM customers WHERE {} = ? ORDER BY seq".format(self.COLUMNS[key]),
+                                     (value,))
+        else:
+            candidates = self._query("SELECT data FROM customers WHERE json_extract(data, {}) = ? "
+                                     "ORDER BY seq".format(self._path(key)), (value,))
+        return [c for c in candidates if c.get(key) == value]
+
+    def create_index(self, field):
+        name = "customers_field_" + hashlib.blake2b(field.encode(), digest_size=6).hexdigest()
+        with self._lock:
+            self._conn.execute("CREATE INDEX IF NOT EXISTS {} ON customers (json_extract(data, {}))".format(
+                name, self._path(field)))
+
+    def begin(self):
+        with self._lock:
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.execute("COMMIT")
+
+    def rollback(self):
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+
+    def reset(self, customers):
+        with self._lock:
+            self.begin()
+            try:
+                self._conn.execute("DELETE FROM customers")
+                self._conn.executemany(self.UPSERT, (self._row(customer) for customer in customers))
+            except BaseException:
+                self.rollback()
+                raise
+            self.commit()
+
+    def compact(self):
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ReadWriteLock:
+    # Many concurrent readers or one writer. Waiting writers block new
+    # readers so a steady stream of searches cannot starve mutations. The
+    # writing thread may re-enter either side; readers may nest reads but
+    # cannot upgrade to a write.
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read_locked(self):
+        if self._writer == threading.get_ident():
+            yield
+            return
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            with self._cond:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if not depth:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write_locked(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            yield
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("Cannot upgrade a read lock to a write lock.")
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class FileLock:
+    # Advisory exclusive lock on a sidecar file, shared by every process
+    # using the same storage_file. Reentrant within a process; threads are
+    # serialized by an in-process mutex since flock is per open file.
+
+    def __init__(self, path):
+        self.path = path
+        self.depth = 0
+        self._file = None
+        self._mutex = threading.RLock()
+
+    def __enter__(self):
+        self._mutex.acquire()
+        if not self.depth:
+            self._file = open(self.path, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if not self.depth:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self._mutex.release()
+
+
+def _reads(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._lock is None:
+            return method(self, *args, **kwargs)
+        with self._lock.read_locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _writes(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._lock is None:
+            return method(self, *args, **kwargs)
+        with self._write_guard():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class OperationMetrics:
+    # Per-operation call counts, result counts and timings for the query
+    # paths; cheap enough to stay on regardless of the logging level.
+
+    def __init__(self):
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, elapsed, result_count):
+        with self._lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = {"calls": 0, "results": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            stats["calls"] += 1
+            stats["results"] += result_count
+            stats["total_seconds"] += elapsed
+            if elapsed > stats["max_seconds"]:
+                stats["max_seconds"] = elapsed
+
+    def snapshot(self):
+        with self._lock:
+            return {operation: dict(stats) for operation, stats in self.operations.items()}
+
+    def reset(self):
+        self.operations = {}
+
+
 class CustomerManagementSystem:
-    def __init__(self, storage_file="customers.json", config_file="config.json"):
+    def __init__(self, storage_file="customers.json", config_file="config.json",
+                 storage_mode="json", compact_every=1000, indexed_fields=(),
+                 payload_sample_rate=0.0, payload_sample_size=5,
+                 compact_records=False, interned_fields=(), concurrency=None,
+                 durability="sync", flush_interval=0.05, flush_max_pending=1000):
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError("Unknown storage mode: {}".format(storage_mode))
+        if durability not in DURABILITY_MODES:
+            raise ValueError("Unknown durability mode: {}".format(durability))
+        if durability != "sync" and storage_mode in SELF_PERSISTING_MODES:
+            # Their stores write each mutation through as it happens, so
+            # deferring the flush would change nothing.
+            raise ValueError("The {} storage mode only supports sync durability.".format(storage_mode))
+        if durability == "group-commit" and concurrency is None:
+            # The background flusher runs alongside callers.
+            concurrency = "thread"
+        if concurrency not in CONCURRENCY_MODES:
+            raise ValueError("Unknown concurrency mode: {}".format(concurrency))
         self.storage_file = storage_file
         self.config_file = config_file
-        self.customers = []
+        self.storage_mode = storage_mode
+        self.compact_every = compact_every
+        self.journal = CustomerJournal(storage_file + ".journal") if storage_mode == "journal" else None
+        self.compact_records = compact_records
+        self.interned_fields = tuple(interned_fields)
+        self._by_id = {}
+        self._indexes = {field: None for field in indexed_fields}
+        self._search_index = None
+        self.metrics = OperationMetrics()
+        self.payload_sample_rate = payload_sample_rate
+        self.payload_sample_size = payload_sample_size
+        self._batch_depth = 0
+        self._pending = []
+        self._undo = []
+        self.concurrency = concurrency
+        self._lock = ReadWriteLock() if concurrency else None
+        self._file_lock = FileLock(storage_file + ".lock") if concurrency == "process" else None
+        self._disk_signature = None
+        self._replaying = False
+        # Outside "sync" durability, mutations stay in _pending until
+        # flush() runs: from the background flusher every flush_interval
+        # seconds or flush_max_pending mutations ("group-commit"), or only
+        # when called explicitly and from close() ("on-close"). The lazy and
+        # sqlite stores always write through and only accept "sync".
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.flush_max_pending = flush_max_pending
+        self._defer_writes = durability != "sync"
+        self._flusher = None
+        self._closed = False
         self.load_data()
         self.load_config()
         self.setup_logging()
-        
+        if durability == "group-commit":
+            self._flush_wakeup = threading.Event()
+            self._flusher = threading.Thread(target=self._flush_loop, name="cms-flusher", daemon=True)
+            self._flusher.start()
+
+    @property
+    @_reads
+    def customers(self):
+        return list(self._by_id.values())
+
+    @customers.setter
+    @_writes
+    def customers(self, customers):
+        customers = unique_by_id(customers)
+        if self.storage_mode in SELF_PERSISTING_MODES:
+            self._by_id.reset(customers)
+        else:
+            self._by_id = self._new_store()
+            for customer in customers:
+                self._by_id[customer["id"]] = customer
+        self._reset_indexes()
+
+    def _new_store(self):
+        if self.compact_records:
+            return CompactCustomerStore(self.interned_fields)
+        return {}
+
+    def _reset_indexes(self):
+        # Lazy stores only page records in on demand, so their indexes are
+        # built on first use instead of at load time (unless readers may run
+        # concurrently, as building would then race).
+        self._indexes = {field: None for field in self._indexes}
+        self._search_index = None
+        if self.storage_mode == "sqlite":
+            # Searches and filters are pushed down into SQL instead.
+            for field in self._indexes:
+                self._by_id.create_index(field)
+        elif self.storage_mode != "lazy" or self._lock is not None:
+            for field in self._indexes:
+                self._build_index(field)
+            self._build_search_index()
+
+    @_reads
+    def get_customer(self, customer_id):
+        return self._by_id.get(customer_id)
+
+    @_writes
+    def create_index(self, field):
+        if self.storage_mode == "sqlite":
+            self._indexes[field] = None
+            self._by_id.create_index(field)
+        elif self._indexes.get(field) is None:
+            self._build_index(field)
+
+    @_writes
+    def drop_index(self, field):
+        self._indexes.pop(field, None)
+
+    def _build_index(self, field):
+        index = self._indexes[field] = {}
+        for customer_id, customer in self._by_id.items():
+            self._index_value(index, customer, field, customer_id)
+
+    @staticmethod
+    def _index_value(index, customer, field, customer_id):
+        if field not in customer:
+            return
+        try:
+            index.setdefault(customer[field], {})[customer_id] = None
+        except TypeError:
+            # Unhashable values can never equal a hashable filter value, and
+            # filtering by an unhashable value falls back to a scan.
+            pass
+
+    @staticmethod
+    def _unindex_value(index, customer, field, customer_id):
+        try:
+            bucket = index.get(customer.get(field))
+        except TypeError:
+            return
+        if bucket is not None:
+            bucket.pop(customer_id, None)
+            if not bucket:
+                del index[customer[field]]
+
+    def _index_customer(self, customer, fields=None):
+        for field in self._indexes if fields is None else fields:
+            index = self._indexes.get(field)
+            if index is not None:
+                self._index_value(index, customer, field, customer["id"])
+
+    def _unindex_customer(self, customer, fields=None):
+        for field in self._indexes if fields is None else fields:
+            index = self._indexes.get(field)
+            if index is not None:
+                self._unindex_value(index, customer, field, customer["id"])
+
+    # Inverted n-gram index over the lowercased search fields. Postings are
+    # dicts used as ordered sets so candidates keep a stable order. Values
+    # that are not strings (e.g. a null email) are never matched.
+    @staticmethod
+    def _search_grams(customer):
+        grams = set()
+        for field in SEARCH_FIELDS:
+            value = customer.get(field)
+            if isinstance(value, str):
+                grams |= ngrams(value.lower())
+        return grams
+
+    def _build_search_index(self):
+        self._search_index = {}
+        for customer in self._by_id.values():
+            self._index_search(customer)
+
+    def _index_search(self, customer, grams=None):
+        if self._search_index is None:
+            return
+        customer_id = customer["id"]
+        for gram in self._search_grams(customer) if grams is None else grams:
+            self._search_index.setdefault(gram, {})[customer_id] = None
+
+    def _unindex_search(self, customer):
+        if self._search_index is None:
+            return
+        customer_id = customer["id"]
+        for gram in self._search_grams(customer):
+            posting = self._search_index.get(gram)
+            if posting is not None:
+                posting.pop(customer_id, None)
+                if not posting:
+                    del self._search_index[gram]
+
+    def _search_candidates(self, term):
+        grams = ngrams(term)
+        if not grams:
+            return self._by_id.values()
+        if self._search_index is None:
+            self._build_search_index()
+        postings = []
+        for gram in grams:
+            posting = self._search_index.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            # Once the set is small, verifying it is cheaper than intersecting further.
+            if len(candidates) <= 64:
+                break
+            candidates = [customer_id for customer_id in candidates if customer_id in posting]
+        return [self._by_id[customer_id] for customer_id in candidates]
+
+    @staticmethod
+    def _matches(customer, term):
+        for field in SEARCH_FIELDS:
+            value = customer.get(field)
+            if isinstance(value, str) and term in value.lower():
+                return True
+        return False
+
+    def _instrument(self, operation, started, results, **query):
+        # Logs counts and timings only; matched records are never formatted
+        # unless DEBUG is enabled and the call is picked for payload sampling.
+        elapsed = time.perf_counter() - started
+        self.metrics.record(operation, elapsed, len(results))
+        logger = logging.getLogger()
+        if logger.isEnabledFor(logging.INFO):
+            fields = " ".join("{}={!r}".format(key, value) for key, value in query.items())
+            logging.info("%s %s results=%d elapsed_ms=%.3f", operation, fields, len(results), elapsed * 1000,
+                         extra={"cms_operation": operation, "cms_query": query,
+                                "cms_results": len(results), "cms_elapsed": elapsed})
+        if (results and self.payload_sample_rate and logger.isEnabledFor(logging.DEBUG)
+                and random.random() < self.payload_sample_rate):
+            logging.debug("%s payload sample: %s", operation, results[:self.payload_sample_size])
+
     def setup_logging(self):
         logging.basicConfig(
             filename="cms.log",
@@ -21,19 +1080,260 @@ class CustomerManagementSystem:
         )
         logging.info("Customer Management System initialized.")
 
+    @contextmanager
+    def _write_guard(self):
+        # Exclusive access for a mutation. In process mode the storage file
+        # lock is held too, and state written by other processes since our
+        # last write is picked up before mutating.
+        with self._lock.write_locked():
+            if self._file_lock is None:
+                yield
+                return
+            with self._file_lock:
+                if self._file_lock.depth == 1:
+                    self._refresh_if_changed()
+                try:
+                    yield
+                finally:
+                    if self._file_lock.depth == 1:
+                        self._disk_signature = self._storage_signature()
+
+    def _storage_signature(self):
+        paths = [self.storage_file]
+        if self.journal is not None:
+            paths.append(self.journal.path)
+        elif self.storage_mode == "lazy":
+            paths.append(self.storage_file + ".idx")
+        elif self.storage_mode == "sqlite":
+            # SQLite does its own cross-process locking and holds no stale copy.
+            return ()
+        signature = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    def _refresh_if_changed(self):
+        signature = self._storage_signature()
+        previous = self._disk_signature
+        if previous is None or signature == previous:
+            return
+        if (self.journal is not None and previous is not None and signature[0] == previous[0]
+                and signature[1] is not None and previous[1] is not None
+                and signature[1][0] == previous[1][0] and signature[1][2] > self.journal.offset):
+            # Only the journal grew: apply just the entries appended since.
+            entries = self.journal.read_from(self.journal.offset)
+            self._replaying = True
+            try:
+                for entry in entries:
+                    self._apply_entry(entry)
+            finally:
+                self._replaying = False
+            logging.info("Applied %d journal entries written by another process.", len(entries))
+        else:
+            # Re-apply mutations that are still waiting for a flush on top
+            # of the reloaded state so they are not lost.
+            pending = self._pending
+            self.load_data()
+            self._replaying = True
+            try:
+                for entry in pending:
+                    self._apply_entry(entry)
+            finally:
+                self._replaying = False
+            self._pending = pending
+            logging.info("Reloaded customer data changed by another process.")
+
+    def _apply_entry(self, entry):
+        op = entry.get("op")
+        if op == "add":
+            self.add_customer(entry["customer"])
+        elif op == "remove":
+            if entry["id"] in self._by_id:
+                self.remove_customer(entry["id"])
+        elif op == "update":
+            if entry["id"] in self._by_id:
+                self.update_customer(entry["id"], entry["data"])
+
+    @_writes
+    def refresh(self):
+        # Taking the write guard picks up changes made by other processes;
+        # readers in process mode call this to see them.
+        pass
+
+    @_writes
     def load_data(self):
+        if self.storage_mode in SELF_PERSISTING_MODES:
+            if not isinstance(self._by_id, dict):
+                self._by_id.close()
+            store_class = LazyCustomerStore if self.storage_mode == "lazy" else SqliteCustomerStore
+            self._by_id = store_class(self.storage_file)
+            self._reset_indexes()
+            logging.info("Customer store opened with %d records.", len(self._by_id))
+            return
+        customers = []
         if os.path.exists(self.storage_file):
             with open(self.storage_file, "r") as file:
-                self.customers = json.load(file)
+                customers = json.load(file)
                 logging.info("Customer data loaded.")
-        else:
-            self.customers = []
+        if self.journal is not None:
+            customers = self.journal.replay(unique_by_id(customers))
+            logging.info("Replayed %d journal entries.", self.journal.pending)
+        self.customers = customers
 
+    @_writes
     def save_data(self):
-        with open(self.storage_file, "w") as file:
-            json.dump(self.customers, file, indent=4)
+        if self.storage_mode in SELF_PERSISTING_MODES:
+            self._by_id.compact()
+        elif self.journal is not None:
+            write_json_atomic(self.storage_file, list(self._by_id.values()))
+            self.journal.truncate()
+        else:
+            write_json_atomic(self.storage_file, list(self._by_id.values()), indent=4)
         logging.info("Customer data saved.")
 
+    @_writes
+    def compact(self):
+        if self.storage_mode == "json":
+            return
+        self.save_data()
+        logging.info("Storage compacted into %s.", self.storage_file)
+
+    def _persist(self, entry):
+        if self._replaying:
+            return
+        self._pending.append(entry)
+        if self._batch_depth:
+            return
+        if not self._defer_writes:
+            self._flush_pending()
+        elif self._flusher is not None and len(self._pending) >= self.flush_max_pending:
+            self._flush_wakeup.set()
+
+    @_writes
+    def flush(self):
+        self._flush_pending()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_wakeup.wait(self.flush_interval)
+            self._flush_wakeup.clear()
+            if self._pending:
+                try:
+                    self.flush()
+                except Exception as error:
+                    self.handle_error(error)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            self._flush_wakeup.set()
+            self._flusher.join()
+        self.flush()
+        if self.storage_mode in SELF_PERSISTING_MODES:
+            self._by_id.close()
+        logging.info("Customer Management System closed.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush_pending(self):
+        if self.storage_mode == "sqlite":
+            # Commit even with nothing pending: a batch that changed nothing
+            # still holds the transaction, and with it SQLite's write lock.
+            self._by_id.commit()
+        elif not self._pending:
+            return
+        elif self.storage_mode == "lazy":
+            # The lazy store appends each write itself; only compaction is due.
+            if self.compact_every and self._by_id.tail_records >= self.compact_every:
+                self.compact()
+        elif self.journal is None:
+            self.save_data()
+        else:
+            self.journal.append_many(self._pending)
+            if self.compact_every and self.journal.pending >= self.compact_every:
+                self.compact()
+        self._pending = []
+
+    @contextmanager
+    def batch(self):
+        if self._lock is None:
+            with self._batch():
+                yield self
+        else:
+            with self._write_guard(), self._batch():
+                yield self
+
+    @contextmanager
+    def _batch(self):
+        # Mutations inside the block are applied in memory and persisted
+        # with a single write when the outermost batch exits. An exception
+        # rolls the state back to where this (possibly nested) batch began.
+        undo_mark, pending_mark = len(self._undo), len(self._pending)
+        if not self._batch_depth and self.storage_mode == "sqlite":
+            self._by_id.begin()
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            logging.warning("Batch rolled back; %d mutations discarded.", len(self._pending) - pending_mark)
+            self._rollback(undo_mark)
+            del self._pending[pending_mark:]
+            if not self._batch_depth and self.storage_mode == "sqlite":
+                self._by_id.rollback()
+            raise
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            count = len(self._pending)
+            if not self._defer_writes:
+                self._flush_pending()
+            self._undo = []
+            logging.info("Batch committed: %d mutations.", count)
+
+    def _remember(self, customer_id, customer):
+        # Records the state of customer_id before a mutation so a failing
+        # batch can restore it; None means the id did not exist.
+        if self._batch_depth:
+            self._undo.append((customer_id, customer))
+
+    def _rollback(self, undo_mark):
+        while len(self._undo) > undo_mark:
+            customer_id, customer = self._undo.pop()
+            if customer is None:
+                self._discard(customer_id)
+                continue
+            current = self._by_id.get(customer_id)
+            if current is not None:
+                self._unindex_customer(current)
+                self._unindex_search(current)
+            self._insert(customer)
+
+    def _insert(self, customer):
+        # Grams are worked out before the store changes, so a record that
+        # cannot be indexed is never left in _by_id without its postings.
+        grams = self._search_grams(customer) if self._search_index is not None else None
+        self._by_id[customer["id"]] = customer
+        self._index_customer(customer)
+        self._index_search(customer, grams)
+
+    def _discard(self, customer_id):
+        customer = self._by_id.pop(customer_id, None)
+        if customer is not None:
+            self._unindex_customer(customer)
+            self._unindex_search(customer)
+        return customer
+
     def load_config(self):
         if os.path.exists(self.config_file):
             with open(self.config_file, "r") as file:
@@ -44,50 +1344,291 @@ class CustomerManagementSystem:
             self.save_config()
 
     def save_config(self):
-        with open(self.config_file, "w") as file:
-            json.dump(self.config, file, indent=4)
+        # Atomic, since another process may be loading the config meanwhile.
+        write_json_atomic(self.config_file, self.config, indent=4)
         logging.info("Default configuration saved.")
 
+    @_writes
     def add_customer(self, customer):
-        self.customers.append(customer)
-        self.save_data()
-        logging.info("Added new customer: %s", customer)
+        previous = self._discard(customer["id"])
+        self._remember(customer["id"], previous)
+        if previous is not None:
+            logging.warning("Replacing existing customer with ID: %s", customer["id"])
+        try:
+            self._insert(customer)
+        except Exception:
+            # e.g. a value the sqlite store cannot encode; keep the old record.
+            if previous is not None:
+                self._insert(previous)
+            raise
+        self._persist({"op": "add", "customer": customer})
+        if not self._batch_depth:
+            logging.info("Added new customer: %s", customer)
+
+    @_writes
+    def add_customers(self, customers):
+        count = 0
+        with self.batch():
+            for customer in customers:
+                self.add_customer(customer)
+                count += 1
+        return count
 
+    @_writes
     def remove_customer(self, customer_id):
-        self.customers = [c for c in self.customers if c["id"] != customer_id]
-        self.save_data()
-        logging.info("Removed customer with ID: %s", customer_id)
+        customer = self._discard(customer_id)
+        if customer is None:
+            logging.warning("Customer with ID %s not found for removal.", customer_id)
+            return
+        self._remember(customer_id, customer)
+        self._persist({"op": "remove", "id": customer_id})
+        if not self._batch_depth:
+            logging.info("Removed customer with ID: %s", customer_id)
 
+    @_reads
     def search_customers(self, search_term):
-        results = [c for c in self.customers if search_term.lower() in c["name"].lower() or search_term.lower() in c["email"].lower()]
-        logging.info("Search customers with term '%s'. Results: %s", search_term, results)
+        started = time.perf_counter()
+        term = search_term.lower()
+        if self.storage_mode == "sqlite":
+            results = self._by_id.search(term)
+        else:
+            results = [c for c in self._search_candidates(term) if self._matches(c, term)]
+        self._instrument("search_customers", started, results, term=search_term)
         return results
 
+    @_reads
     def filter_customers(self, key, value):
-        results = [c for c in self.customers if c.get(key) == value]
-        logging.info("Filtered customers by %s=%s. Results: %s", key, value, results)
+        started = time.perf_counter()
+        if self.storage_mode == "sqlite":
+            results = self._by_id.filter(key, value)
+            indexed = results is not None
+        else:
+            if key in self._indexes and self._indexes[key] is None:
+                self._build_index(key)
+            index = self._indexes.get(key)
+            try:
+                bucket = index.get(value, {}) if index is not None else None
+            except TypeError:
+                bucket = None
+            indexed = bucket is not None
+            results = [self._by_id[customer_id] for customer_id in bucket] if indexed else None
+        if results is None:
+            results = [c for c in self._by_id.values() if c.get(key) == value]
+        self._instrument("filter_customers", started, results, key=key, value=value, indexed=indexed)
         return results
 
-    def generate_report(self, report_file="report.txt"):
-        with open(report_file, "w") as file:
-            file.write("Customer Report - Generated on {}
-".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            file.write("===================================\n")
-            for customer in self.customers:
-                file.write(json.dumps(customer, indent=4) + "\n")
+    @staticmethod
+    def _check_report_args(fmt, fields):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError("Unknown report format: {}".format(fmt))
+        if fields is None:
+            return None
+        if isinstance(fields, str) or not all(isinstance(field, str) for field in fields):
+            raise ValueError("Report fields must be a list of field names: {!r}".format(fields))
+        return list(fields)
+
+    def iter_report(self, fmt="text", predicate=None, fields=None, chunk_size=1000):
+        # Yields the report as text chunks of up to chunk_size records, so
+        # callers can stream it (e.g. as an HTTP response body) without
+        # materializing the whole report. Customers must not be added or
+        # removed while the generator is being consumed; with a concurrency
+        # mode the read lock is held until it is exhausted or closed, so
+        # consume it from a single thread. Arguments are checked right away,
+        # not on the first next().
+        fields = self._check_report_args(fmt, fields)
+        return self._locked_report(fmt, predicate, fields, chunk_size)
+
+    def _locked_report(self, fmt, predicate, fields, chunk_size):
+        if self._lock is None:
+            yield from self._iter_report(fmt, predicate, fields, chunk_size)
+            return
+        with self._lock.read_locked():
+            yield from self._iter_report(fmt, predicate, fields, chunk_size)
+
+    def _selected(self, predicate):
+        return (c for c in self._by_id.values() if predicate is None or predicate(c))
+
+    @staticmethod
+    def _csv_row(customer):
+        # Lists and dicts are written as JSON rather than Python reprs.
+        return {field: json.dumps(value, separators=(",", ":")) if isinstance(value, (dict, list)) else value
+                for field, value in customer.items()}
+
+    def _iter_report(self, fmt, predicate, fields, chunk_size):
+        buffer = io.StringIO()
+        writer = None
+        if fmt == "text":
+            buffer.write("Customer Report - Generated on {}\n".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            buffer.write("===================================\n")
+        elif fmt == "csv":
+            if fields is None:
+                # Records need not share a schema: without a projection the
+                # header is every field seen, which costs one extra pass.
+                fields = list({field: None for customer in self._selected(predicate) for field in customer})
+            writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+            if fields:
+                writer.writeheader()
+        rows = 0
+        for customer in self._selected(predicate):
+            if fmt == "csv":
+                writer.writerow(self._csv_row(customer))
+            else:
+                record = customer if fields is None else {field: customer.get(field) for field in fields}
+                if fmt == "ndjson":
+                    buffer.write(json.dumps(record, separators=(",", ":")) + "\n")
+                else:
+                    buffer.write(json.dumps(record, indent=4) + "\n")
+            rows += 1
+            if rows % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def generate_report(self, report_file="report.txt", fmt="text", predicate=None, fields=None, chunk_size=1000):
+        # iter_report() validates its arguments before the file is opened,
+        # so a bad format leaves an existing report untouched.
+        chunks = self.iter_report(fmt, predicate, fields, chunk_size)
+        newline = "" if fmt == "csv" else None
+        with open(report_file, "w", newline=newline) as file:
+            for chunk in chunks:
+                file.write(chunk)
         logging.info("Customer report generated.")
 
     def handle_error(self, error):
         logging.error("Error occurred: %s", error)
 
+    @_writes
     def update_customer(self, customer_id, updated_data):
-        for customer in self.customers:
-            if customer["id"] == customer_id:
-                customer.update(updated_data)
-                self.save_data()
-                logging.info("Updated customer with ID: %s to %s", customer_id, updated_data)
-                return
-        logging.warning("Customer with ID %s not found for update.", customer_id)
+        customer = self._by_id.get(customer_id)
+        if customer is None:
+            logging.warning("Customer with ID %s not found for update.", customer_id)
+            return False
+        new_id = updated_data.get("id", customer_id)
+        if new_id != customer_id and new_id in self._by_id:
+            raise ValueError("Customer with ID {} already exists.".format(new_id))
+        if self._batch_depth:
+            self._remember(customer_id, dict(customer))
+            if new_id != customer_id:
+                self._remember(new_id, None)
+        fields = None if new_id != customer_id else updated_data
+        searchable = fields is None or any(field in updated_data for field in SEARCH_FIELDS)
+        self._unindex_customer(customer, fields)
+        if searchable:
+            self._unindex_search(customer)
+        customer.update(updated_data)
+        if new_id != customer_id:
+            del self._by_id[customer_id]
+        self._by_id[new_id] = customer
+        self._index_customer(customer, fields)
+        if searchable:
+            self._index_search(customer)
+        self._persist({"op": "update", "id": customer_id, "data": updated_data})
+        if not self._batch_depth:
+            logging.info("Updated customer with ID: %s to %s", customer_id, updated_data)
+        return True
+
+    @_writes
+    def update_customers(self, updates):
+        count = 0
+        with self.batch():
+            for customer_id, updated_data in updates.items():
+                if self.update_customer(customer_id, updated_data):
+                    count += 1
+        return count
+
+class AsyncCustomerManagementSystem:
+    # asyncio facade over CustomerManagementSystem. Blocking work runs on a
+    # bounded thread pool, so the event loop never waits on file I/O.
+    # Mutations are applied in memory right away, and concurrent callers
+    # share one flush: each awaits until a flush that includes its change
+    # has completed. Create instances with `await AsyncCustomerManagementSystem.create(...)`.
+
+    def __init__(self, cms, executor):
+        self.cms = cms
+        self._executor = executor
+        self._flush_task = None
+
+    @classmethod
+    async def create(cls, *args, max_workers=4, **kwargs):
+        kwargs.setdefault("concurrency", "thread")
+        storage_mode = kwargs.get("storage_mode", args[2] if len(args) > 2 else "json")
+        kwargs.setdefault("durability", "sync" if storage_mode in SELF_PERSISTING_MODES else "on-close")
+        if kwargs["concurrency"] is None:
+            raise ValueError("AsyncCustomerManagementSystem needs a concurrency mode.")
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cms")
+        loop = asyncio.get_running_loop()
+        cms = await loop.run_in_executor(executor, functools.partial(CustomerManagementSystem, *args, **kwargs))
+        return cls(cms, executor)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _mutate(self, func, *args):
+        result = await self._run(func, *args)
+        await self.flush()
+        return result
+
+    async def flush(self):
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+        await asyncio.shield(self._flush_task)
+
+    async def _flush(self):
+        # Yield once so mutations finishing in the same loop iteration join
+        # this flush; later ones start the next.
+        await asyncio.sleep(0)
+        self._flush_task = None
+        await self._run(self.cms.flush)
+
+    async def add_customer(self, customer):
+        return await self._mutate(self.cms.add_customer, customer)
+
+    async def add_customers(self, customers):
+        return await self._mutate(self.cms.add_customers, list(customers))
+
+    async def remove_customer(self, customer_id):
+        return await self._mutate(self.cms.remove_customer, customer_id)
+
+    async def update_customer(self, customer_id, updated_data):
+        return await self._mutate(self.cms.update_customer, customer_id, updated_data)
+
+    async def update_customers(self, updates):
+        return await self._mutate(self.cms.update_customers, dict(updates))
+
+    async def get_customer(self, customer_id):
+        return await self._run(self.cms.get_customer, customer_id)
+
+    async def search_customers(self, search_term):
+        return await self._run(self.cms.search_customers, search_term)
+
+    async def filter_customers(self, key, value):
+        return await self._run(self.cms.filter_customers, key, value)
+
+    async def generate_report(self, report_file="report.txt", **kwargs):
+        return await self._run(self.cms.generate_report, report_file, **kwargs)
+
+    async def load_data(self):
+        return await self._run(self.cms.load_data)
+
+    async def save_data(self):
+        return await self._run(self.cms.save_data)
+
+    async def load_config(self):
+        return await self._run(self.cms.load_config)
+
+    async def close(self):
+        await self.flush()
+        await self._run(self.cms.close)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
 
 # Example usage:
 if __name__ == "__main__":
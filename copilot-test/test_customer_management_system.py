@@ -0,0 +1,437 @@
+# Tests for CustomerManagementSystem storage modes
+#
+# Usage:
+#   python -m pytest copilot-test
+import asyncio
+import csv
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from customer_management_system import (DURABILITY_MODES, SELF_PERSISTING_MODES, STORAGE_MODES,
+                                        AsyncCustomerManagementSystem, CompactCustomerStore,
+                                        CustomerManagementSystem)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def customer(customer_id, name=None):
+    name = name or "Customer {}".format(customer_id)
+    return {"id": customer_id, "name": name, "email": "c{}@example.com".format(customer_id)}
+
+
+@pytest.fixture
+def open_cms(tmp_path, monkeypatch):
+    # cms.log and config.json are written to the working directory.
+    monkeypatch.chdir(tmp_path)
+    opened = []
+
+    def factory(storage_mode="json", **kwargs):
+        cms = CustomerManagementSystem(storage_file=str(tmp_path / "customers.json"),
+                                       config_file=str(tmp_path / "config.json"),
+                                       storage_mode=storage_mode, **kwargs)
+        opened.append(cms)
+        return cms
+
+    yield factory
+    for cms in opened:
+        cms.close()
+
+
+def ids(cms):
+    return sorted(c["id"] for c in cms.customers)
+
+
+def test_journal_replays_unsnapshotted_mutations(open_cms):
+    cms = open_cms("journal")
+    cms.add_customers([customer(1), customer(2), customer(3)])
+    cms.update_customer(2, {"name": "Renamed"})
+    cms.remove_customer(3)
+    # No close(): the snapshot was never written, only the journal.
+    assert not os.path.exists(cms.storage_file)
+
+    reopened = open_cms("journal")
+    assert ids(reopened) == [1, 2]
+    assert reopened.get_customer(2)["name"] == "Renamed"
+    assert reopened.journal.pending == 5
+
+
+def test_journal_cuts_torn_tail(open_cms):
+    cms = open_cms("journal")
+    cms.add_customer(customer(1))
+    good_size = os.path.getsize(cms.journal.path)
+    with open(cms.journal.path, "ab") as file:
+        file.write(b'{"op":"add","customer":{"id":2,"na')
+
+    reopened = open_cms("journal")
+    assert ids(reopened) == [1]
+    assert os.path.getsize(reopened.journal.path) == good_size
+    reopened.add_customer(customer(3))
+    assert ids(open_cms("journal")) == [1, 3]
+
+
+@pytest.mark.parametrize("storage_mode", STORAGE_MODES)
+def test_batch_rolls_back_on_error(open_cms, storage_mode):
+    cms = open_cms(storage_mode)
+    cms.add_customers([customer(1), customer(2)])
+    with pytest.raises(RuntimeError):
+        with cms.batch():
+            cms.add_customer(customer(3))
+            cms.update_customer(1, {"name": "Changed"})
+            cms.remove_customer(2)
+            raise RuntimeError("abort")
+    assert ids(cms) == [1, 2]
+    assert cms.get_customer(1)["name"] == "Customer 1"
+    assert cms.search_customers("changed") == []
+    cms.close()
+
+    reopened = open_cms(storage_mode)
+    assert ids(reopened) == [1, 2]
+    assert reopened.get_customer(1)["name"] == "Customer 1"
+
+
+DURABLE_COMBINATIONS = [(mode, durability) for mode in STORAGE_MODES
+                        for durability in DURABILITY_MODES
+                        if durability == "sync" or mode not in SELF_PERSISTING_MODES]
+
+
+@pytest.mark.parametrize("storage_mode, durability", DURABLE_COMBINATIONS)
+def test_reopen_after_close(open_cms, storage_mode, durability):
+    cms = open_cms(storage_mode, durability=durability, indexed_fields=("email",))
+    cms.add_customers([customer(i) for i in range(1, 6)])
+    cms.update_customer(2, {"name": "Zed"})
+    cms.remove_customer(5)
+    cms.close()
+
+    reopened = open_cms(storage_mode, indexed_fields=("email",))
+    assert ids(reopened) == [1, 2, 3, 4]
+    assert [c["id"] for c in reopened.search_customers("zed")] == [2]
+    assert [c["id"] for c in reopened.filter_customers("email", "c3@example.com")] == [3]
+
+
+@pytest.mark.parametrize("noop", [
+    lambda cms: cms.remove_customer(999),
+    lambda cms: cms.add_customers([]),
+    lambda cms: cms.update_customers({}),
+], ids=["remove-missing", "add-none", "update-none"])
+def test_sqlite_noop_batch_releases_write_lock(open_cms, noop):
+    cms = open_cms("sqlite")
+    with cms.batch():
+        noop(cms)
+    assert not cms._by_id._conn.in_transaction
+    other = sqlite3.connect(cms.storage_file, timeout=0)
+    try:
+        other.execute("BEGIN IMMEDIATE")
+        other.execute("ROLLBACK")
+    finally:
+        other.close()
+
+
+def test_sqlite_failed_batch_keeps_earlier_batches(open_cms):
+    cms = open_cms("sqlite")
+    with cms.batch():
+        cms.add_customer(customer(1))
+    assert not cms._by_id._conn.in_transaction
+    with pytest.raises(RuntimeError):
+        with cms.batch():
+            cms.add_customer(customer(2))
+            raise RuntimeError("abort")
+    assert ids(cms) == [1]
+    cms.close()
+    assert ids(open_cms("sqlite")) == [1]
+
+
+@pytest.mark.parametrize("durability", ["group-commit", "on-close"])
+@pytest.mark.parametrize("storage_mode", SELF_PERSISTING_MODES)
+def test_write_through_modes_reject_deferred_durability(open_cms, storage_mode, durability):
+    with pytest.raises(ValueError):
+        open_cms(storage_mode, durability=durability)
+
+
+def test_sqlite_converts_json_file(open_cms):
+    cms = open_cms("json")
+    cms.add_customers([customer(1), customer(2)])
+    cms.close()
+
+    converted = open_cms("sqlite")
+    assert ids(converted) == [1, 2]
+    with open(converted.storage_file + ".json.bak") as file:
+        assert json.load(file) == [customer(1), customer(2)]
+
+
+def test_sqlite_conversion_failure_keeps_json(open_cms):
+    cms = open_cms("json")
+    cms.close()
+    with open(cms.storage_file, "w") as file:
+        # A record without an id makes the import fail halfway.
+        json.dump([customer(1), {"name": "No id"}], file)
+
+    with pytest.raises(KeyError):
+        open_cms("sqlite")
+    with open(cms.storage_file) as file:
+        assert json.load(file) == [customer(1), {"name": "No id"}]
+
+
+WRITER = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, {here!r})
+    from customer_management_system import CustomerManagementSystem
+    storage_file, mode, first = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    cms = CustomerManagementSystem(storage_file=storage_file, config_file=storage_file + ".config",
+                                   storage_mode=mode, concurrency="process")
+    for customer_id in range(first, first + 50):
+        cms.add_customer({{"id": customer_id, "name": "P", "email": "p@example.com"}})
+    cms.close()
+""").format(here=HERE)
+
+
+@pytest.mark.parametrize("storage_mode", STORAGE_MODES)
+def test_two_processes_write_concurrently(open_cms, tmp_path, storage_mode):
+    storage_file = str(tmp_path / "customers.json")
+    writers = [subprocess.Popen([sys.executable, "-c", WRITER, storage_file, storage_mode, str(first)],
+                                cwd=str(tmp_path))
+               for first in (0, 1000)]
+    assert [writer.wait(timeout=120) for writer in writers] == [0, 0]
+
+    cms = open_cms(storage_mode)
+    assert ids(cms) == list(range(50)) + list(range(1000, 1050))
+
+
+
+@pytest.mark.parametrize("storage_mode", STORAGE_MODES)
+def test_non_string_search_fields_are_skipped(open_cms, tmp_path, storage_mode):
+    with open(str(tmp_path / "customers.json"), "w") as file:
+        json.dump([{"id": 1, "name": "Ann", "email": None}], file)
+    cms = open_cms(storage_mode)
+    cms.add_customer({"id": 2, "name": None, "email": "ann@example.com"})
+    cms.add_customer({"id": 3, "name": 42, "email": "bob@example.com"})
+    assert [c["id"] for c in cms.search_customers("ann")] == [1, 2]
+    assert cms.search_customers("42") == []
+    assert ids(cms) == [1, 2, 3]
+
+
+def test_failed_replace_keeps_previous_record(open_cms):
+    cms = open_cms("sqlite")
+    cms.add_customer(customer(1))
+    with pytest.raises(TypeError):
+        cms.add_customer({"id": 1, "name": object()})
+    assert cms.get_customer(1) == customer(1)
+    assert [c["id"] for c in cms.search_customers("customer 1")] == [1]
+
+
+def test_text_report(open_cms, tmp_path):
+    cms = open_cms()
+    cms.add_customers([customer(1), customer(2)])
+    report = tmp_path / "report.txt"
+    cms.generate_report(str(report), predicate=lambda c: c["id"] == 2)
+    lines = report.read_text().splitlines()
+    assert lines[0].startswith("Customer Report - Generated on ")
+    assert json.loads("\n".join(lines[2:])) == customer(2)
+
+
+def test_ndjson_report_projects_fields(open_cms, tmp_path):
+    cms = open_cms()
+    cms.add_customers([customer(1), dict(customer(2), tags=["vip"])])
+    report = tmp_path / "report.ndjson"
+    cms.generate_report(str(report), fmt="ndjson", fields=["id", "tags"], chunk_size=1)
+    assert [json.loads(line) for line in report.read_text().splitlines()] == [
+        {"id": 1, "tags": None}, {"id": 2, "tags": ["vip"]}]
+
+
+def test_csv_report_keeps_every_column(open_cms, tmp_path):
+    cms = open_cms()
+    cms.add_customers([customer(1), dict(customer(2), phone="555", tags=["vip"], address={"city": "Tokyo"})])
+    report = tmp_path / "report.csv"
+    cms.generate_report(str(report), fmt="csv")
+    with open(str(report), newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert list(rows[0]) == ["id", "name", "email", "phone", "tags", "address"]
+    assert rows[0]["phone"] == ""
+    assert rows[1]["phone"] == "555"
+    assert json.loads(rows[1]["tags"]) == ["vip"]
+    assert json.loads(rows[1]["address"]) == {"city": "Tokyo"}
+
+
+def test_csv_report_header_without_records(open_cms, tmp_path):
+    cms = open_cms()
+    report = tmp_path / "report.csv"
+    cms.generate_report(str(report), fmt="csv", fields=["id", "name"])
+    assert report.read_text() == "id,name\n"
+
+
+@pytest.mark.parametrize("fmt, fields", [("xml", None), ("csv", "name"), ("ndjson", ["id", 1])])
+def test_invalid_report_arguments_keep_existing_report(open_cms, tmp_path, fmt, fields):
+    cms = open_cms()
+    cms.add_customer(customer(1))
+    report = tmp_path / "report.txt"
+    report.write_text("previous report\n")
+    with pytest.raises(ValueError):
+        cms.generate_report(str(report), fmt=fmt, fields=fields)
+    with pytest.raises(ValueError):
+        cms.iter_report(fmt, fields=fields)
+    assert report.read_text() == "previous report\n"
+
+
+SEARCH_TERMS = ["customer 1", "ann", "c12@", "zz", "1", 'o"b', "ÉCL", "missing"]
+
+
+def test_sqlite_search_matches_in_memory_index(open_cms):
+    records = [customer(i) for i in range(1, 30)] + [
+        {"id": 30, "name": 'Bo"b Éclair', "email": None},
+        {"id": 31, "name": "Anne", "email": "ANN@example.com"},
+    ]
+    cms = open_cms("sqlite")
+    cms.add_customers(records)
+    cms.update_customer(2, {"name": "Annabel"})
+    cms.remove_customer(12)
+    assert cms._by_id._fts
+    for term in SEARCH_TERMS:
+        found = [c["id"] for c in cms.search_customers(term)]
+        scanned = [c["id"] for c in cms.customers if CustomerManagementSystem._matches(c, term.lower())]
+        assert found == scanned, term
+    plan = cms._by_id._conn.execute("EXPLAIN QUERY PLAN SELECT rowid FROM customers_search "
+                                    "WHERE customers_search MATCH '\"ann\"'").fetchall()
+    assert "customers_search" in str(plan)
+
+
+def test_sqlite_search_index_is_built_for_older_databases(open_cms):
+    cms = open_cms("sqlite")
+    cms.add_customers([customer(1), customer(2, "Annabel")])
+    cms._by_id._conn.executescript("DROP TABLE customers_search;")
+    cms.close()
+
+    reopened = open_cms("sqlite")
+    assert [c["id"] for c in reopened.search_customers("nnab")] == [2]
+
+
+@pytest.mark.parametrize("storage_mode", STORAGE_MODES)
+def test_duplicate_ids_are_reported(open_cms, tmp_path, caplog, storage_mode):
+    with open(str(tmp_path / "customers.json"), "w") as file:
+        json.dump([customer(1), customer(2), customer(1, "Second copy"), customer(3), customer(2, "Last")], file)
+    cms = open_cms(storage_mode)
+    assert ids(cms) == [1, 2, 3]
+    assert cms.get_customer(1)["name"] == "Second copy"
+    assert cms.get_customer(2)["name"] == "Last"
+    warnings = [record.getMessage() for record in caplog.records if "duplicate" in record.getMessage()]
+    assert warnings == ["Dropped 2 duplicate customer records (the last copy of each id is kept); ids: [1, 2]"]
+
+
+def test_compact_store_round_trips_records():
+    store = CompactCustomerStore(interned_fields=("city",))
+    records = [
+        # Built at run time, so only the store can have interned it.
+        {"id": 1, "name": "A", "city": "".join(["To", "kyo"])},
+        {"id": 2, "email": "b@example.com", "tags": ["vip"]},
+        {"id": 3, "name": None},
+    ]
+    for record in records:
+        store[record["id"]] = record
+    assert [store[record["id"]] for record in records] == records
+    assert list(store.values()) == records
+    assert dict(store.items()) == {record["id"]: record for record in records}
+    # Fields a record never had stay absent rather than coming back as None.
+    assert "email" not in store[1] and "city" not in store[3]
+    assert store._rows[1][store._positions["city"]] is sys.intern("Tokyo")
+
+    del store[2]
+    assert 2 not in store and len(store) == 2
+    with pytest.raises(KeyError):
+        store[2]
+
+
+def test_compact_store_returns_copies():
+    store = CompactCustomerStore()
+    store[1] = customer(1)
+    store[1]["name"] = "Changed"
+    assert store[1] == customer(1)
+
+
+@pytest.mark.parametrize("storage_mode", ["json", "journal"])
+def test_compact_records_id_change_and_compaction(open_cms, storage_mode):
+    cms = open_cms(storage_mode, compact_records=True, compact_every=3, indexed_fields=("email",))
+    assert isinstance(cms._by_id, CompactCustomerStore)
+    cms.add_customers([customer(1), customer(2)])
+    assert cms.update_customer(1, {"id": 10, "name": "Moved"})
+    assert cms.get_customer(1) is None
+    assert cms.get_customer(10) == {"id": 10, "name": "Moved", "email": "c1@example.com"}
+    assert [c["id"] for c in cms.search_customers("moved")] == [10]
+    assert [c["id"] for c in cms.filter_customers("email", "c1@example.com")] == [10]
+    if storage_mode == "journal":
+        # Three journal entries reached compact_every: folded into the snapshot.
+        assert cms.journal.pending == 0
+        assert os.path.getsize(cms.journal.path) == 0
+    cms.close()
+
+    reopened = open_cms(storage_mode, compact_records=True)
+    assert ids(reopened) == [2, 10]
+    assert reopened.get_customer(10)["name"] == "Moved"
+
+
+def stored_ids(cms):
+    with open(cms.storage_file) as file:
+        return sorted(c["id"] for c in json.load(file))
+
+
+async def open_async(tmp_path, **kwargs):
+    return await AsyncCustomerManagementSystem.create(storage_file=str(tmp_path / "customers.json"),
+                                                      config_file=str(tmp_path / "config.json"), **kwargs)
+
+
+def count_saves(cms):
+    saves = []
+    save_data = cms.save_data
+
+    def counting_save():
+        saves.append(len(cms._pending))
+        save_data()
+    cms.save_data = counting_save
+    return saves
+
+
+def test_async_concurrent_mutations_share_flushes(open_cms, tmp_path):
+    async def scenario():
+        async with await open_async(tmp_path) as cms:
+            saves = count_saves(cms.cms)
+            await asyncio.gather(*(cms.add_customer(customer(i)) for i in range(50)))
+            # Every caller returned only after a flush that included its change.
+            assert stored_ids(cms.cms) == list(range(50))
+            assert 1 <= len(saves) < 50
+            assert sum(saves) == 50
+
+            await cms.update_customer(3, {"name": "Renamed"})
+            assert saves[-1] == 1
+            return await cms.search_customers("renamed")
+
+    assert [c["id"] for c in asyncio.run(scenario())] == [3]
+    assert open_cms().get_customer(3)["name"] == "Renamed"
+
+
+def test_async_flush_error_reaches_every_waiting_caller(open_cms, tmp_path):
+    async def scenario():
+        async with await open_async(tmp_path) as cms:
+            save_data = cms.cms.save_data
+
+            def failing_save():
+                raise OSError("disk full")
+            cms.cms.save_data = failing_save
+            outcomes = await asyncio.gather(*(cms.add_customer(customer(i)) for i in range(5)),
+                                            return_exceptions=True)
+            assert outcomes and all(isinstance(outcome, OSError) for outcome in outcomes)
+            # The mutations stay applied and pending; the next flush retries them.
+            assert ids(cms.cms) == [0, 1, 2, 3, 4]
+            cms.cms.save_data = save_data
+            await cms.flush()
+            assert stored_ids(cms.cms) == [0, 1, 2, 3, 4]
+
+    asyncio.run(scenario())
+
+
+def test_async_requires_a_concurrency_mode(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError):
+        asyncio.run(open_async(tmp_path, concurrency=None))
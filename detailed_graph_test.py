@@ -2,99 +2,34 @@
 体重グラフの詳細テスト
 """
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
-import time
 import sys
-import json
+
+from browser_pool import start_browser
+from graph_check_helpers import wait_for_chart, hold_for_viewing
+from graph_probe import run_probe, save_snapshot
+from graph_tests.datasets import DATASETS, build_entries
 
 sys.stdout.reconfigure(encoding='utf-8')
 
-def main():
+def main(manual=False):
     print("=== 体重グラフ詳細テスト ===\n")
     
-    # コンソールログを有効化
-    caps = DesiredCapabilities.CHROME
-    caps['goog:loggingPrefs'] = {'browser': 'ALL'}
-    
-    options = webdriver.ChromeOptions()
-    options.set_capability('goog:loggingPrefs', {'browser': 'ALL'})
-    
-    driver = webdriver.Chrome(options=options)
+    # コンソールログ有効・ログイン・体重タブ初期化済みのブラウザ
+    # 既定はログインをシミュレートし、複数測定の日を含むテストデータを入れる。
+    # --manual-login なら実際にログインしてFirebaseのデータを使う
+    print("📊 アプリケーションを開いています...")
+    if manual:
+        print("⏳ ログイン完了を待機中...")
+        driver = start_browser(manual=True)
+    else:
+        driver = start_browser(data=build_entries(DATASETS["mixed"]))
     
     try:
-        print("📊 アプリケーションを開いています...")
-        driver.get("http://localhost:8080")
-        time.sleep(3)
-        
-        # Googleログイン
-        print("\n🔐 Googleログインボタンをクリック...")
-        try:
-            login_btn = driver.find_element(By.XPATH, "//button[contains(., 'Google')]")
-            login_btn.click()
-            time.sleep(2)
-            windows = driver.window_handles
-            if len(windows) > 1:
-                driver.switch_to.window(windows[0])
-        except:
-            print("⚠️ ログインボタンが見つかりません")
-        
-        # ログイン完了を待つ
-        print("\n⏳ ログイン完了を待機中（20秒）...")
-        time.sleep(20)
+        if manual:
+            # データ読み込み後の初回描画を待つ
+            wait_for_chart(driver)
         
-        # 体重タブに切り替え
-        print("\n📊 体重タブに切り替え...")
-        driver.execute_script("if (typeof showTab === 'function') showTab(1)")
-        time.sleep(3)
-        
-        # 現在のデータを確認
-        print("\n📊 現在のデータ状態を確認...")
-        data_info = driver.execute_script("""
-            if (window.WeightTab && window.WeightTab.allWeightData) {
-                // 日付ごとにグループ化
-                const grouped = {};
-                window.WeightTab.allWeightData.forEach(entry => {
-                    if (!grouped[entry.date]) {
-                        grouped[entry.date] = [];
-                    }
-                    grouped[entry.date].push(entry);
-                });
-                
-                // 複数測定がある日を探す
-                const multipleDays = [];
-                Object.entries(grouped).forEach(([date, entries]) => {
-                    if (entries.length > 1) {
-                        multipleDays.push({
-                            date: date,
-                            count: entries.length,
-                            values: entries.map(e => e.value || e.weight)
-                        });
-                    }
-                });
-                
-                return {
-                    totalCount: window.WeightTab.allWeightData.length,
-                    uniqueDays: Object.keys(grouped).length,
-                    multipleMeasurementDays: multipleDays
-                };
-            }
-            return null;
-        """)
-        
-        if data_info:
-            print(f"  総データ数: {data_info['totalCount']}件")
-            print(f"  ユニーク日数: {data_info['uniqueDays']}日")
-            print(f"  複数測定日数: {len(data_info['multipleMeasurementDays'])}日")
-            
-            if data_info['multipleMeasurementDays']:
-                print("\n  複数測定がある日の例:")
-                for day in data_info['multipleMeasurementDays'][:3]:  # 最初の3日分
-                    print(f"    {day['date']}: {day['count']}回測定 {day['values']}")
-        
-        # 修正版のupdateChart関数を注入（詳細ログ付き）
-        print("\n🔧 修正版updateChart関数を注入...")
+        # 修正版のupdateChart関数（詳細ログ付き）
         update_chart_code = """
 window.updateChart = function(days = 30) {
     console.log('🔴🔴🔴 修正版updateChart実行中!!!! days=' + days);
@@ -290,68 +225,54 @@ console.log('✅ updateChart関数を修正版に置き換えました！');
 return true;
 """
         
-        driver.execute_script(update_chart_code)
+        # 各期間でテスト（詳細版）
+        periods = [(7, "1週間"), (30, "1ヶ月")]
+        
+        # 修正版updateChartの注入・各期間の描画・データセットとログの取得を
+        # 1回のスクリプト実行（graph_probe）でまとめて行う
+        print("\n🔧 修正版updateChart関数を注入して各期間を描画...")
+        result = run_probe(driver, [days for days, _ in periods], setup=update_chart_code,
+                           detail=True, logs=True, snapshots=[days for days, _ in periods])
         print("✅ 修正版関数の注入成功！")
         
-        # コンソールログを全て表示
-        def print_all_console_logs():
-            logs = driver.get_log('browser')
-            if logs:
-                print("\n[コンソールログ]")
-                for log in logs:
-                    msg = log['message']
-                    if '🔴' in msg or 'updateChart' in msg or 'データセット' in msg:
-                        # Chrome DevToolsのログフォーマットを整形
-                        if 'console-api' in msg:
-                            parts = msg.split('"')
-                            if len(parts) > 1:
-                                actual_msg = parts[1]
-                                print(f"  {actual_msg}")
-                        else:
-                            print(f"  {msg}")
+        # 現在のデータを確認
+        print("\n📊 現在のデータ状態を確認...")
+        data_info = result['data']
+        print(f"  総データ数: {data_info['totalCount']}件")
+        print(f"  ユニーク日数: {data_info['uniqueDays']}日")
+        print(f"  複数測定日数: {len(data_info['multipleMeasurementDays'])}日")
         
-        # 各期間でテスト（詳細版）
-        periods = [(7, "1週間"), (30, "1ヶ月")]
+        if data_info['multipleMeasurementDays']:
+            print("\n  複数測定がある日の例:")
+            for day in data_info['multipleMeasurementDays'][:3]:  # 最初の3日分
+                print(f"    {day['date']}: {day['count']}回測定 {day['values']}")
+        
+        # コンソールログを表示
+        def print_console_logs(logs):
+            messages = [log['message'] for log in logs
+                        if '🔴' in log['message'] or 'updateChart' in log['message']
+                        or 'データセット' in log['message']]
+            if messages:
+                print("\n[コンソールログ]")
+                for message in messages:
+                    print(f"  {message}")
         
-        for days, name in periods:
+        for (days, name), entry in zip(periods, result['periods']):
             print(f"\n\n{'='*60}")
             print(f"🔄 {name}表示をテスト...")
             print('='*60)
             
-            # コンソールログをクリア
-            driver.get_log('browser')
-            
-            # updateChartを実行
-            driver.execute_script(f"updateChart({days})")
-            time.sleep(2)
+            if entry['error']:
+                print(f"❌ updateChart({days})でエラー: {entry['error']}")
             
             # コンソールログ確認
-            print_all_console_logs()
-            
-            # データセット情報を詳細に取得
-            dataset_info = driver.execute_script("""
-                if (window.WeightTab && window.WeightTab.weightChart) {
-                    const datasets = window.WeightTab.weightChart.data.datasets;
-                    return {
-                        count: datasets.length,
-                        datasets: datasets.map(ds => ({
-                            label: ds.label,
-                            dataCount: ds.data.length,
-                            hasDash: ds.borderDash ? true : false,
-                            borderColor: ds.borderColor,
-                            firstData: ds.data.length > 0 ? {x: ds.data[0].x, y: ds.data[0].y} : null,
-                            lastData: ds.data.length > 0 ? {x: ds.data[ds.data.length-1].x, y: ds.data[ds.data.length-1].y} : null
-                        }))
-                    };
-                }
-                return null;
-            """)
+            print_console_logs(entry['logs'])
             
-            if dataset_info:
+            if entry['exists']:
                 print(f"\n📊 実際のグラフのデータセット情報:")
-                print(f"  データセット数: {dataset_info['count']}")
-                for i, ds in enumerate(dataset_info['datasets']):
-                    dash = " (破線)" if ds['hasDash'] else ""
+                print(f"  データセット数: {entry['datasetCount']}")
+                for i, ds in enumerate(entry['datasets']):
+                    dash = " (破線)" if ds['borderDash'] else ""
                     print(f"\n  [{i}] {ds['label']}: {ds['dataCount']}件{dash}")
                     print(f"      色: {ds['borderColor']}")
                     if ds['firstData']:
@@ -359,13 +280,12 @@ return true;
                     if ds['lastData']:
                         print(f"      最後: x={ds['lastData']['x']}, y={ds['lastData']['y']}")
             
-            # スクリーンショット
-            driver.save_screenshot(f"detailed_test_{name}.png")
-            print(f"\n📸 スクリーンショット保存: detailed_test_{name}.png")
+            # グラフの画像
+            if save_snapshot(entry, f"detailed_test_{name}.png"):
+                print(f"\n📸 グラフ画像保存: detailed_test_{name}.png")
         
         print("\n\n✅ 詳細テスト完了！")
-        print("\n⏳ 15秒後に自動で閉じます...")
-        time.sleep(15)
+        hold_for_viewing()
         
     except Exception as e:
         print(f"\n❌ エラー: {str(e)}")
@@ -376,4 +296,4 @@ return true;
         print("\n✅ ブラウザを閉じました")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(manual="--manual-login" in sys.argv)
\ No newline at end of file
@@ -1,74 +1,420 @@
 import os
+import re
+import sys
 import json
-from pathlib import Path
-
-categories = {
-    "core_app": {"count": 0, "patterns": ["index.html", "tabs/*/tab-*.js", "tabs/*/tab-*.html", "tabs/*/*.css", "shared/core/*.js", "shared/common*.js"]},
-    "config": {"count": 0, "patterns": ["*/config*.js", "*/firebase*.js", "config/*.json", "package.json"]},
-    "utilities": {"count": 0, "patterns": ["shared/utils/*.js", "shared/components/*.js"]},
-    "styles": {"count": 0, "patterns": ["shared/styles/*.css", "custom/*.css"]},
-    "tests": {"count": 0, "patterns": ["*test*.js", "*test*.html", "*checker*.js", "*analyzer*.js"]},
-    "reports": {"count": 0, "patterns": ["*report*.html", "*report*.json", "*metrics*.json", "*evidence*.csv"]},
-    "docs": {"count": 0, "patterns": ["*.md", "documentation/**/*.md", "handover/**/*.md"]},
-    "backups": {"count": 0, "patterns": ["*backup*", "*.bak", "archive/**/*"]},
-    "tools": {"count": 0, "patterns": ["tools/**/*.js", "development/tools/**/*.js"]},
-    "demos": {"count": 0, "patterns": ["*demo*.html", "examples/*.html"]},
-    "build": {"count": 0, "patterns": ["*.bat", "*.sh", "*.ps1", "Makefile"]},
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Categories are checked in order; the first matching pattern wins.
+# Patterns use glob semantics on the path relative to the scanned root:
+#   *   matches within one path segment, ** matches any number of directories,
+#   and a pattern without "/" matches the file name in any directory.
+CATEGORIES = {
+    "core_app": ["index.html", "tabs/*/tab-*.js", "tabs/*/tab-*.html", "tabs/*/*.css", "shared/core/*.js", "shared/common*.js"],
+    "config": ["**/config*.js", "**/firebase*.js", "config/*.json", "package.json"],
+    "utilities": ["shared/utils/*.js", "shared/components/*.js"],
+    "styles": ["shared/styles/*.css", "custom/*.css"],
+    "tests": ["*test*.js", "*test*.html", "*checker*.js", "*analyzer*.js"],
+    "reports": ["*report*.html", "*report*.json", "*metrics*.json", "*evidence*.csv"],
+    "docs": ["*.md", "documentation/**/*.md", "handover/**/*.md"],
+    "backups": ["*backup*", "*.bak", "archive/**/*"],
+    "tools": ["tools/**/*.js", "development/tools/**/*.js"],
+    "demos": ["*demo*.html", "examples/*.html"],
+    "build": ["*.bat", "*.sh", "*.ps1", "Makefile"],
 }
 
 ignored = ["node_modules", ".git", "__pycache__", ".cache"]
 
-for root, dirs, files in os.walk("."):
-    dirs[:] = [d for d in dirs if d not in ignored]
-    
-    for file in files:
-        file_path = os.path.join(root, file)
-        categorized = False
-        
-        # Check each category
-        for cat, data in categories.items():
-            for pattern in data["patterns"]:
-                if "**" in pattern:
-                    if pattern.replace("**", "") in file_path:
-                        categories[cat]["count"] += 1
-                        categorized = True
-                        break
-                elif "*" in pattern:
-                    pattern_parts = pattern.split("*")
-                    if all(part in file_path for part in pattern_parts if part):
-                        categories[cat]["count"] += 1
-                        categorized = True
-                        break
-                elif pattern == file or pattern in file_path:
-                    categories[cat]["count"] += 1
-                    categorized = True
-                    break
-            if categorized:
-                break
-
-print("=== CREATIVE FILE ANALYSIS ===")
-print("\nREAL Developer Files (what actually matters):")
-real_count = categories["core_app"]["count"] + categories["config"]["count"] + categories["utilities"]["count"] + categories["styles"]["count"]
-print(f"  Core Application: {categories['core_app']['count']}")
-print(f"  Configuration: {categories['config']['count']}")
-print(f"  Utilities: {categories['utilities']['count']}")
-print(f"  Styles: {categories['styles']['count']}")
-print(f"  TOTAL REAL FILES: {real_count}")
-
-print("\nGenerated/Secondary Files:")
-secondary_count = categories["tests"]["count"] + categories["reports"]["count"] + categories["tools"]["count"]
-print(f"  Tests: {categories['tests']['count']}")
-print(f"  Reports: {categories['reports']['count']}")
-print(f"  Tools: {categories['tools']['count']}")
-print(f"  TOTAL: {secondary_count}")
-
-print("\nDocumentation Bloat:")
-print(f"  Documentation: {categories['docs']['count']}")
-print(f"  Backups: {categories['backups']['count']}")
-print(f"  Examples/Demos: {categories['demos']['count']}")
-
-print("\nBUILD SCRIPTS:")
-print(f"  Build/Deploy: {categories['build']['count']}")
-
-bloat_ratio = (categories['docs']['count'] + categories['reports']['count'] + categories['backups']['count']) / max(real_count, 1)
-print(f"\n📊 BLOAT RATIO: {bloat_ratio:.2f}x (docs+reports+backups vs real code)")
+SNAPSHOT_FILE = ".file_categorizer_snapshot.json"
+SNAPSHOT_VERSION = 1
+
+
+def glob_to_regex(pattern):
+    """Translate a glob pattern into a regex fragment matching a relative POSIX path."""
+    if "/" not in pattern:
+        pattern = "**/" + pattern
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+class Categorizer:
+    """Classifies paths with all category patterns compiled into one regex.
+
+    Each category becomes a named group of an alternation tried in category
+    order, so classifying a path is a single fullmatch.
+    """
+
+    def __init__(self, categories=CATEGORIES):
+        self.names = list(categories)
+        # Identifies the rules a snapshot was taken with
+        self.key = json.dumps([categories, ignored], sort_keys=True)
+        alternatives = [
+            f"(?P<c{index}>{'|'.join(glob_to_regex(p) for p in patterns)})"
+            for index, patterns in enumerate(categories.values())
+        ]
+        self.regex = re.compile("|".join(alternatives), re.DOTALL)
+
+    def classify(self, path):
+        """Return the category of a relative path, or None."""
+        match = self.regex.fullmatch(path.replace(os.sep, "/"))
+        if not match:
+            return None
+        return self.names[int(match.lastgroup[1:])]
+
+
+def new_stats(names):
+    return {name: {"count": 0, "bytes": 0, "lines": 0, "newest_mtime": 0.0} for name in names}
+
+
+def merge_stats(total, part):
+    for name, data in part.items():
+        merged = total[name]
+        merged["count"] += data["count"]
+        merged["bytes"] += data["bytes"]
+        merged["lines"] += data["lines"]
+        merged["newest_mtime"] = max(merged["newest_mtime"], data["newest_mtime"])
+    return total
+
+
+def count_lines(path, chunk_size=1 << 20):
+    """Count newline bytes without decoding the file."""
+    lines = 0
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                lines += chunk.count(b"\n")
+    except OSError:
+        pass
+    return lines
+
+
+def scan_dir(path, relative, categorizer, with_lines=True, recursive=True):
+    """Walk one directory with os.scandir and aggregate stats per category."""
+    stats = new_stats(categorizer.names)
+    stack = [(path, relative)]
+    while stack:
+        dir_path, dir_relative = stack.pop()
+        try:
+            entries = os.scandir(dir_path)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                entry_relative = entry.name if not dir_relative else dir_relative + "/" + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and entry.name not in ignored:
+                            stack.append((entry.path, entry_relative))
+                        continue
+                    if not entry.is_file():
+                        continue
+                    category = categorizer.classify(entry_relative)
+                    if not category:
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                data = stats[category]
+                data["count"] += 1
+                data["bytes"] += st.st_size
+                if st.st_mtime > data["newest_mtime"]:
+                    data["newest_mtime"] = st.st_mtime
+                if with_lines:
+                    data["lines"] += count_lines(entry.path)
+    return stats
+
+
+def scan_tree(root=".", categorizer=None, workers=None, with_lines=True):
+    """Aggregate count, bytes, lines and newest mtime per category.
+
+    Files directly under root are scanned in the calling thread; each
+    top-level directory is scanned by a worker thread.
+    """
+    categorizer = categorizer or Categorizer()
+    stats = new_stats(categorizer.names)
+    with os.scandir(root) as entries:
+        top_dirs = [entry for entry in entries
+                    if entry.is_dir(follow_symlinks=False) and entry.name not in ignored]
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as executor:
+        futures = [executor.submit(scan_dir, entry.path, entry.name, categorizer, with_lines)
+                   for entry in top_dirs]
+        merge_stats(stats, scan_dir(root, "", categorizer, with_lines, recursive=False))
+        for future in futures:
+            merge_stats(stats, future.result())
+    return stats
+
+
+def snapshot_dir(path, relative, categorizer, old_dirs, recursive=True):
+    """Snapshot records for a directory (and its subtree when recursive).
+
+    A directory whose mtime matches the old snapshot keeps its file records
+    without stat'ing them; only its subdirectories are checked. Changed
+    directories are re-listed, and a file whose size, mtime and inode are
+    unchanged keeps its line count.
+    """
+    dirs = {}
+    stack = [(path, relative)]
+    while stack:
+        dir_path, dir_relative = stack.pop()
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except OSError:
+            continue
+        old = old_dirs.get(dir_relative)
+        if old and old["mtime"] == mtime:
+            record = old
+        else:
+            record = list_dir(dir_path, dir_relative, categorizer, mtime, old)
+        dirs[dir_relative] = record
+        if recursive:
+            for name in record["dirs"]:
+                stack.append((os.path.join(dir_path, name), dir_relative + "/" + name if dir_relative else name))
+    return dirs
+
+
+def list_dir(dir_path, dir_relative, categorizer, mtime, old=None):
+    """Re-list one directory: subdirectory names and categorized file records."""
+    old_files = old["files"] if old else {}
+    record = {"mtime": mtime, "dirs": [], "files": {}}
+    try:
+        entries = os.scandir(dir_path)
+    except OSError:
+        return record
+    with entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in ignored:
+                        record["dirs"].append(entry.name)
+                    continue
+                if not entry.is_file():
+                    continue
+                category = categorizer.classify(dir_relative + "/" + entry.name if dir_relative else entry.name)
+                if not category:
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            previous = old_files.get(entry.name)
+            if previous and previous[1:4] == [st.st_size, st.st_mtime, st.st_ino]:
+                lines = previous[4]
+            else:
+                lines = count_lines(entry.path)
+            # [category, size, mtime, inode, lines]
+            record["files"][entry.name] = [category, st.st_size, st.st_mtime, st.st_ino, lines]
+    return record
+
+
+def build_snapshot(root=".", categorizer=None, old=None, workers=None):
+    """Snapshot the tree, reusing unchanged directories from old.
+
+    The old snapshot is ignored if it was taken with different categories.
+    """
+    categorizer = categorizer or Categorizer()
+    if not old or old.get("key") != categorizer.key:
+        old = {"dirs": {}}
+    old_dirs = old["dirs"]
+    dirs = snapshot_dir(root, "", categorizer, old_dirs, recursive=False)
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as executor:
+        futures = [executor.submit(snapshot_dir, os.path.join(root, name), name, categorizer, old_dirs)
+                   for name in dirs.get("", {"dirs": []})["dirs"]]
+        for future in futures:
+            dirs.update(future.result())
+    return {"version": SNAPSHOT_VERSION, "key": categorizer.key, "dirs": dirs}
+
+
+def load_snapshot(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return snapshot if snapshot.get("version") == SNAPSHOT_VERSION else None
+
+
+def save_snapshot(snapshot, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+
+
+def iter_snapshot_files(snapshot):
+    """Yield (relative path, record) for every file in a snapshot."""
+    for dir_relative, record in snapshot["dirs"].items():
+        for name, file_record in record["files"].items():
+            yield (dir_relative + "/" + name if dir_relative else name), file_record
+
+
+def snapshot_stats(snapshot, names=None):
+    """Per-category stats (same shape as scan_tree()) from a snapshot."""
+    stats = new_stats(names or Categorizer().names)
+    for _, (category, size, mtime, _inode, lines) in iter_snapshot_files(snapshot):
+        data = stats[category]
+        data["count"] += 1
+        data["bytes"] += size
+        data["lines"] += lines
+        data["newest_mtime"] = max(data["newest_mtime"], mtime)
+    return stats
+
+
+def snapshot_delta(old, new):
+    """Per-category changes between two snapshots.
+
+    Returns {category: {"count", "bytes", "lines", "added", "removed", "modified"}}
+    for the categories that changed.
+    """
+    old_files = dict(iter_snapshot_files(old)) if old else {}
+    new_files = dict(iter_snapshot_files(new))
+    delta = {}
+
+    def bucket(category):
+        return delta.setdefault(category, {"count": 0, "bytes": 0, "lines": 0,
+                                           "added": 0, "removed": 0, "modified": 0})
+
+    for path, record in new_files.items():
+        previous = old_files.get(path)
+        if previous == record:
+            continue
+        if previous is None or previous[0] != record[0]:
+            data = bucket(record[0])
+            data["added"] += 1
+            data["count"] += 1
+            data["bytes"] += record[1]
+            data["lines"] += record[4]
+            if previous is None:
+                continue
+        else:
+            data = bucket(record[0])
+            data["modified"] += 1
+            data["bytes"] += record[1] - previous[1]
+            data["lines"] += record[4] - previous[4]
+            continue
+        # Category changed: count it as removed from the old one
+        previous_data = bucket(previous[0])
+        previous_data["removed"] += 1
+        previous_data["count"] -= 1
+        previous_data["bytes"] -= previous[1]
+        previous_data["lines"] -= previous[4]
+    for path, previous in old_files.items():
+        if path not in new_files:
+            data = bucket(previous[0])
+            data["removed"] += 1
+            data["count"] -= 1
+            data["bytes"] -= previous[1]
+            data["lines"] -= previous[4]
+    return delta
+
+
+def print_delta(delta):
+    print("\n=== CHANGES SINCE LAST RUN ===")
+    if not delta:
+        print("  (no changes)")
+        return
+    for category, data in delta.items():
+        print(f"  {category}: {data['count']:+d} files, {data['bytes']:+d} bytes, {data['lines']:+d} lines "
+              f"(added {data['added']}, removed {data['removed']}, modified {data['modified']})")
+
+
+def categorize(root=".", categorizer=None):
+    """Count files per category under root."""
+    return {name: data["count"] for name, data in scan_tree(root, categorizer, with_lines=False).items()}
+
+
+def to_json(stats):
+    """Stats as JSON, with newest_mtime as an ISO 8601 timestamp."""
+    output = {}
+    for name, data in stats.items():
+        newest = data["newest_mtime"]
+        output[name] = dict(data, newest_mtime=datetime.fromtimestamp(newest, timezone.utc).isoformat() if newest else None)
+    return json.dumps(output, indent=2)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def print_report(stats):
+    def line(label, name):
+        data = stats[name]
+        print(f"  {label}: {data['count']} ({format_size(data['bytes'])}, {data['lines']} lines)")
+
+    def total(names, key):
+        return sum(stats[name][key] for name in names)
+
+    real = ["core_app", "config", "utilities", "styles"]
+    secondary = ["tests", "reports", "tools"]
+    bloat = ["docs", "reports", "backups"]
+
+    print("=== CREATIVE FILE ANALYSIS ===")
+    print("\nREAL Developer Files (what actually matters):")
+    line("Core Application", "core_app")
+    line("Configuration", "config")
+    line("Utilities", "utilities")
+    line("Styles", "styles")
+    real_count = total(real, "count")
+    print(f"  TOTAL REAL FILES: {real_count} ({format_size(total(real, 'bytes'))}, {total(real, 'lines')} lines)")
+
+    print("\nGenerated/Secondary Files:")
+    line("Tests", "tests")
+    line("Reports", "reports")
+    line("Tools", "tools")
+    print(f"  TOTAL: {total(secondary, 'count')} ({format_size(total(secondary, 'bytes'))}, {total(secondary, 'lines')} lines)")
+
+    print("\nDocumentation Bloat:")
+    line("Documentation", "docs")
+    line("Backups", "backups")
+    line("Examples/Demos", "demos")
+
+    print("\nBUILD SCRIPTS:")
+    line("Build/Deploy", "build")
+
+    bloat_ratio = total(bloat, "count") / max(real_count, 1)
+    print(f"\n📊 BLOAT RATIO: {bloat_ratio:.2f}x (docs+reports+backups vs real code)")
+    print(f"   by size:  {total(bloat, 'bytes') / max(total(real, 'bytes'), 1):.2f}x")
+    print(f"   by lines: {total(bloat, 'lines') / max(total(real, 'lines'), 1):.2f}x")
+
+
+if __name__ == "__main__":
+    if "--incremental" in sys.argv:
+        # Only directories whose mtime changed are re-listed; files edited in
+        # place keep their recorded size/lines until their directory changes.
+        snapshot_path = os.path.join(".", SNAPSHOT_FILE)
+        if "--snapshot" in sys.argv and sys.argv.index("--snapshot") + 1 < len(sys.argv):
+            snapshot_path = sys.argv[sys.argv.index("--snapshot") + 1]
+        previous = load_snapshot(snapshot_path)
+        snapshot = build_snapshot(".", old=previous)
+        stats = snapshot_stats(snapshot)
+        delta = snapshot_delta(previous, snapshot)
+        save_snapshot(snapshot, snapshot_path)
+        if "--json" in sys.argv:
+            print(json.dumps({"stats": json.loads(to_json(stats)), "delta": delta}, indent=2))
+        else:
+            print_report(stats)
+            print_delta(delta)
+    else:
+        stats = scan_tree(".")
+        if "--json" in sys.argv:
+            print(to_json(stats))
+        else:
+            print_report(stats)
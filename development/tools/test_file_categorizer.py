@@ -0,0 +1,123 @@
+"""
+Tests for file_categorizer's glob patterns and snapshot deltas.
+
+  python -m pytest development/tools/test_file_categorizer.py
+"""
+
+import pytest
+
+from file_categorizer import Categorizer, build_snapshot, snapshot_delta
+
+
+def classify(patterns, path):
+    return Categorizer({"match": patterns}).classify(path)
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("tabs/tab1/style.css", "match"),
+    ("tabs/style.css", None),
+    ("tabs/tab1/sub/style.css", None),
+])
+def test_star_stays_within_one_segment(path, expected):
+    assert classify(["tabs/*/*.css"], path) == expected
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("documentation/guide.md", "match"),
+    ("documentation/a/b/guide.md", "match"),
+    ("other/documentation/guide.md", None),
+    ("documentation/guide.txt", None),
+])
+def test_double_star_matches_any_depth(path, expected):
+    assert classify(["documentation/**/*.md"], path) == expected
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("file1.txt", "match"),
+    ("deep/dir/file1.txt", "match"),
+    ("file10.txt", None),
+    ("file.txt", None),
+])
+def test_question_mark_matches_one_character(path, expected):
+    assert classify(["file?.txt"], path) == expected
+
+
+def test_question_mark_does_not_match_separator():
+    assert classify(["a?b/c.js"], "a/b/c.js") is None
+    assert classify(["a?b/c.js"], "a-b/c.js") == "match"
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("config/app.json", "match"),
+    ("sub/config/app.json", None),
+])
+def test_pattern_with_slash_is_anchored_at_root(path, expected):
+    assert classify(["config/*.json"], path) == expected
+
+
+def test_pattern_without_slash_matches_name_in_any_directory():
+    assert classify(["*.md"], "README.md") == "match"
+    assert classify(["*.md"], "a/b/README.md") == "match"
+    assert classify(["*.md"], "a.md/file.txt") is None
+
+
+def test_special_characters_are_literal():
+    assert classify(["v1.0+(x).js"], "v1.0+(x).js") == "match"
+    assert classify(["v1.0+(x).js"], "v1a0+(x).js") is None
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("development/tools/helper.js", "tools"),
+    ("development/tools/foo-test.js", "tests"),
+    ("notes-backup.md", "docs"),
+    ("archive/old/notes.txt", "backups"),
+    ("index.html", "core_app"),
+    ("shared/utils/firebase-config.js", "config"),
+    ("unknown.bin", None),
+])
+def test_first_matching_category_wins(path, expected):
+    assert Categorizer().classify(path) == expected
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_snapshot_delta_counts_added_modified_and_removed(tmp_path):
+    write(tmp_path / "index.html", "<html>\n")
+    write(tmp_path / "notes.md", "one\n")
+    write(tmp_path / "docs" / "old.md", "a\nb\n")
+    write(tmp_path / "ignored.bin", "x")
+    old = build_snapshot(str(tmp_path))
+
+    write(tmp_path / "tabs" / "tab1" / "tab-weight.js", "x\ny\nz\n")
+    write(tmp_path / "notes.md", "one\ntwo\n")
+    (tmp_path / "docs" / "old.md").unlink()
+    new = build_snapshot(str(tmp_path), old=old)
+
+    assert new == build_snapshot(str(tmp_path))
+    assert snapshot_delta(old, new) == {
+        "core_app": {"count": 1, "bytes": 6, "lines": 3, "added": 1, "removed": 0, "modified": 0},
+        # notes.md grew by 4 bytes / 1 line, old.md (4 bytes / 2 lines) went away
+        "docs": {"count": -1, "bytes": 0, "lines": -1, "added": 0, "removed": 1, "modified": 1},
+    }
+    assert snapshot_delta(new, new) == {}
+
+
+def test_snapshot_delta_moves_files_whose_category_changed(tmp_path):
+    write(tmp_path / "a.md", "x\n")
+    old = build_snapshot(str(tmp_path), Categorizer({"docs": ["*.md"]}))
+    new = build_snapshot(str(tmp_path), Categorizer({"notes": ["*.md"]}), old=old)
+
+    assert snapshot_delta(old, new) == {
+        "notes": {"count": 1, "bytes": 2, "lines": 1, "added": 1, "removed": 0, "modified": 0},
+        "docs": {"count": -1, "bytes": -2, "lines": -1, "added": 0, "removed": 1, "modified": 0},
+    }
+
+
+def test_snapshot_delta_from_nothing_adds_everything(tmp_path):
+    write(tmp_path / "build.sh", "echo\n")
+    assert snapshot_delta(None, build_snapshot(str(tmp_path))) == {
+        "build": {"count": 1, "bytes": 5, "lines": 1, "added": 1, "removed": 0, "modified": 0},
+    }
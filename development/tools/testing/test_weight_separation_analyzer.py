@@ -0,0 +1,144 @@
+"""
+weight_separation_analyzer のテスト（除去範囲・ディレクトリモード・キャッシュ）
+
+  python -m pytest development/tools/testing
+"""
+
+import json
+
+from weight_separation_analyzer import AnalysisCache, WeightCodeAnalyzer, analyze_tree, collect_files, splice_out
+
+HTML_TEXT = "<p>This function shows your weight (kg) history.</p>\n"
+PAGE = (
+    "<html><body>\n"
+    + HTML_TEXT
+    + "<div>\n"
+    "<script>\n"
+    "const config = { a: 1 };\n"
+    "function drawWeight(x) { return x; }\n"
+    "</script>\n"
+    "</body></html>\n"
+)
+
+
+def removed(content, **options):
+    analyzer = WeightCodeAnalyzer("index.html")
+    return splice_out(content, analyzer.removal_ranges(content, **options))
+
+
+def test_match_outside_script_is_not_spliced():
+    analyzer = WeightCodeAnalyzer("index.html")
+    spans = [f["span"] for f in analyzer.analyze_content(PAGE)["functions_to_remove"]]
+    assert PAGE.index("function shows") not in [span[0] for span in spans if span]
+
+    updated = removed(PAGE)
+    assert HTML_TEXT in updated
+    assert "<div>\n<script>\nconst config = { a: 1 };\n" in updated
+    assert "drawWeight" not in updated
+
+
+def test_function_in_script_is_spliced_whole():
+    updated = removed(PAGE)
+    assert "function drawWeight" not in updated
+    assert updated == PAGE.replace("function drawWeight(x) { return x; }", "")
+
+
+def test_apply_keeps_crlf_line_endings(tmp_path):
+    index = tmp_path / "index.html"
+    original = PAGE.replace("\n", "\r\n").encode("utf-8")
+    index.write_bytes(original)
+    analyzer = WeightCodeAnalyzer(str(index))
+    summary = analyzer.apply_removals()
+
+    assert (tmp_path / "index.html.pre-separation-backup").read_bytes() == original
+    updated = index.read_bytes()
+    assert b"drawWeight" not in updated
+    assert updated.count(b"\n") == updated.count(b"\r\n") == original.count(b"\r\n")
+    assert summary["backup"].endswith(".pre-separation-backup")
+
+
+TREE = {
+    "tabs/tab1/tab-weight.js": "function drawWeight(x) {\n  return weightChart;\n}\n",
+    "tabs/tab1/helper.js": "const weightValue = 1;\n",
+    "shared/core/state.js": "let weightData = [];\nconst other = 2;\n",
+    "pages/index.html": PAGE,
+    "node_modules/lib/index.html": PAGE,
+    "notes.txt": "weightChart\n",
+}
+
+
+def make_tree(root, files=TREE):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return root
+
+
+def open_cache(path):
+    return AnalysisCache(path, WeightCodeAnalyzer().pattern_hash())
+
+
+def test_collect_files_follows_globs_and_skips_excluded_dirs(tmp_path):
+    files = [path.as_posix() for path in collect_files(make_tree(tmp_path))]
+    assert files == ["pages/index.html", "shared/core/state.js", "tabs/tab1/tab-weight.js"]
+
+
+def test_tree_results_match_single_file_analysis(tmp_path):
+    root = make_tree(tmp_path)
+    merged = analyze_tree(root, workers=1)
+    assert merged["files"] == ["pages/index.html", "shared/core/state.js", "tabs/tab1/tab-weight.js"]
+    assert merged["errors"] == []
+
+    analyzer = WeightCodeAnalyzer()
+    for name in merged["files"]:
+        single = analyzer.analyze_content((root / name).read_text(encoding="utf-8"))
+        for key in ("weight_related", "functions_to_remove"):
+            items = [dict(item) for item in merged[key] if item["file"] == name]
+            for item in items:
+                del item["file"]
+            assert json.loads(json.dumps(items)) == json.loads(json.dumps(single[key]))
+
+    assert analyze_tree(root, workers=2) == merged
+
+
+def test_warm_cache_after_edit_matches_cold_scan(tmp_path):
+    root = make_tree(tmp_path / "tree")
+    cache_path = tmp_path / "cache.json"
+    cache = open_cache(cache_path)
+    analyze_tree(root, workers=1, cache=cache)
+    cache.save()
+
+    edited = root / "shared/core/state.js"
+    edited.write_text("const weightTotal = 0;\nlet weightData = [];\nconst other = 2;\n", encoding="utf-8")
+    warm = analyze_tree(root, workers=1, cache=open_cache(cache_path))
+    assert warm == analyze_tree(root, workers=1)
+    assert {item["line"] for item in warm["weight_related"] if item["file"] == "shared/core/state.js"} == {1, 2}
+
+
+def test_cache_prunes_entries_of_removed_files(tmp_path):
+    root = make_tree(tmp_path / "tree")
+    other = make_tree(tmp_path / "other", {"shared/x.js": "weightChart\n"})
+    cache_path = tmp_path / "cache.json"
+    cache = open_cache(cache_path)
+    analyze_tree(root, workers=1, cache=cache)
+    analyze_tree(other, workers=1, cache=cache)
+    cache.save()
+
+    (root / "tabs/tab1/tab-weight.js").rename(root / "tabs/tab1/tab-renamed.js")
+    cache = open_cache(cache_path)
+    analyze_tree(root, workers=1, cache=cache)
+    cache.prune(root)
+    cache.save()
+
+    keys = set(open_cache(cache_path).entries)
+    expected = {str((root / name).resolve()) for name in
+                ("pages/index.html", "shared/core/state.js", "tabs/tab1/tab-renamed.js")}
+    # 走査したroot以外のエントリはファイルが消えるまで残る
+    assert keys == expected | {str((other / "shared/x.js").resolve())}
+
+    (other / "shared/x.js").unlink()
+    cache = open_cache(cache_path)
+    cache.prune()
+    cache.save()
+    assert set(open_cache(cache_path).entries) == expected
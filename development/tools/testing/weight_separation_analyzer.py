@@ -4,10 +4,313 @@
 index.htmlから体重関連コードを自動検出・分析
 """
 
+import os
 import re
 import json
+import time
+import difflib
+import hashlib
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+FUNCTION_PATTERNS = [
+    r'window\.saveWeightData\s*=.*?\{',
+    r'window\.loadUserWeightData\s*=.*?\{',
+    r'function.*weight.*\(',
+    r'async.*weight.*\(',
+]
+
+# 除去対象（generate_removal_script()のsedと同じ規則、行単位・大文字小文字区別）
+CSS_REMOVE_PATTERN = re.compile(r'\.weight-input[^}\n]*}')
+VARIABLE_REMOVE_PATTERNS = [
+    re.compile(r'let.*weight.*='),
+    re.compile(r'const.*weight.*='),
+    re.compile(r'window\.editingEntryId'),
+]
+
+OUTPUT_DIR = './tools/testing/analysis-results/'
+
+# 分析結果キャッシュのファイル名（OUTPUT_DIR内）
+CACHE_FILE = '.weight_analysis_cache.json'
+
+# ディレクトリモードで対象にするファイル
+TREE_GLOBS = [
+    'tabs/*/tab-*.js',
+    'shared/**/*.js',
+    '**/*.html',
+]
+
+# ディレクトリモードで走査しないディレクトリ
+EXCLUDED_DIRS = {'.git', 'node_modules'}
+
+
+def line_starts(content):
+    """各行の先頭オフセット表（bisectで位置→行番号を引くため）"""
+    starts = [0]
+    pos = content.find('\n')
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = content.find('\n', pos + 1)
+    return starts
+
+
+# JS字句解析用（コード中で意味のある文字だけを拾う）
+JS_CODE_TOKEN = re.compile(r'[{}\'"`/]')
+JS_STRING_BODY = {
+    "'": re.compile(r"(?:[^'\\\n]|\\[\s\S])*'?"),
+    '"': re.compile(r'(?:[^"\\\n]|\\[\s\S])*"?'),
+}
+JS_TEMPLATE_STOP = re.compile(r'\\[\s\S]|`|\$\{')
+JS_REGEX_BODY = re.compile(r'(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])*/?')
+JS_WORD_BEFORE = re.compile(r'[\w$]+$')
+# この単語の直後の / は除算ではなく正規表現リテラル
+JS_REGEX_KEYWORDS = {
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+    'void', 'throw', 'instanceof', 'yield', 'await',
+}
+HTML_START = re.compile(r'\s*<[!a-zA-Z]')
+SCRIPT_BLOCK = re.compile(r'<script\b[^>]*>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+_TEMPLATE = -1
+
+
+def script_ranges(content):
+    """JSとして解析する範囲 [(start, end)]
+
+    先頭がタグならHTMLとみなしてscript要素の中身だけ、そうでなければ全体。
+    """
+    if not HTML_START.match(content):
+        return [(0, len(content))]
+    return [match.span(1) for match in SCRIPT_BLOCK.finditer(content)]
+
+
+def _regex_allowed(content, pos, start):
+    """posの / が正規表現リテラルの開始かどうか（直前の字句で判定）"""
+    i = pos - 1
+    while i >= start and content[i].isspace():
+        i -= 1
+    if i < start:
+        return True
+    prev = content[i]
+    if prev in ')]\'"`':
+        return False
+    if prev.isalnum() or prev in '_$':
+        word = JS_WORD_BEFORE.search(content, max(start, i - 15), i + 1)
+        return word is not None and word.group() in JS_REGEX_KEYWORDS
+    return True
+
+
+def scan_js(content, start=0, end=None):
+    """content[start:end]をJSとして1回だけ走査する
+
+    文字列・コメント・テンプレートリテラル・正規表現リテラルを読み飛ばしながら
+    波括弧の深さを追い、(コード中の { の位置→対応する } の位置, 非コード範囲のリスト)
+    を返す。閉じていない { は含まれない。
+    """
+    end = len(content) if end is None else end
+    pairs = {}
+    skipped = []
+    stack = []
+    pos = start
+    while pos < end:
+        match = JS_CODE_TOKEN.search(content, pos, end)
+        if not match:
+            break
+        pos = match.start()
+        char = match.group()
+        if char == '{':
+            stack.append(pos)
+            pos += 1
+        elif char == '}':
+            if stack and stack[-1] == _TEMPLATE:
+                # ${...} の終わり: テンプレートリテラルの続きへ
+                stack.pop()
+                pos = _skip_template(content, pos, end, stack, skipped)
+            else:
+                if stack:
+                    pairs[stack.pop()] = pos
+                pos += 1
+        elif char == '`':
+            pos = _skip_template(content, pos, end, stack, skipped)
+        elif char in '\'"':
+            body = JS_STRING_BODY[char].match(content, pos + 1, end)
+            skipped.append((pos, body.end()))
+            pos = body.end()
+        elif content.startswith('//', pos):
+            newline = content.find('\n', pos, end)
+            stop = end if newline == -1 else newline
+            skipped.append((pos, stop))
+            pos = stop
+        elif content.startswith('/*', pos):
+            close = content.find('*/', pos + 2, end)
+            stop = end if close == -1 else close + 2
+            skipped.append((pos, stop))
+            pos = stop
+        elif _regex_allowed(content, pos, start):
+            body = JS_REGEX_BODY.match(content, pos + 1, end)
+            skipped.append((pos, body.end()))
+            pos = body.end()
+        else:
+            pos += 1
+    return pairs, skipped
+
+
+def _skip_template(content, pos, end, stack, skipped):
+    """テンプレートリテラルの文字列部分を読み飛ばす（posは ` または ${} の } の位置）
+
+    ${ に入ったらスタックに印を積んでコード位置を返す。
+    """
+    begin = pos
+    pos += 1
+    while pos < end:
+        match = JS_TEMPLATE_STOP.search(content, pos, end)
+        if not match:
+            break
+        token = match.group()
+        if token == '`':
+            skipped.append((begin, match.end()))
+            return match.end()
+        if token == '${':
+            skipped.append((begin, match.start()))
+            stack.append(_TEMPLATE)
+            return match.end()
+        pos = match.end()
+    skipped.append((begin, end))
+    return end
+
+
+def function_spans(content, matches):
+    """関数パターンのマッチ位置からブロック全体の [start, end) を求める
+
+    matchesは (マッチ開始, マッチ終了) のリスト。マッチ開始以降で最初に現れる
+    コード中の { から対応する } までをブロックとみなし、直後の ; も含める。
+    マッチが<script>の外（HTMLの本文など）やコメント・文字列の中にある場合、
+    間に ; を挟む場合、ブロックが閉じていない場合はNone。
+    """
+    spans = [None] * len(matches)
+    if not matches:
+        return spans
+    pairs = {}
+    skipped = []
+    ranges = script_ranges(content)
+    for start, end in ranges:
+        range_pairs, range_skipped = scan_js(content, start, end)
+        pairs.update(range_pairs)
+        skipped.extend(range_skipped)
+    range_starts = [start for start, _ in ranges]
+    opens = sorted(pairs)
+    skipped.sort()
+    skipped_starts = [start for start, _ in skipped]
+    for n, (start, _) in enumerate(matches):
+        r = bisect_right(range_starts, start) - 1
+        if r < 0 or start >= ranges[r][1]:
+            continue
+        k = bisect_right(skipped_starts, start) - 1
+        if k >= 0 and skipped[k][0] <= start < skipped[k][1]:
+            continue
+        k = bisect_right(opens, start - 1)
+        # ブロックは同じスクリプト内で始まっていなければならない
+        if k == len(opens) or opens[k] >= ranges[r][1]:
+            continue
+        brace = opens[k]
+        if ';' in content[start:brace]:
+            continue
+        stop = pairs[brace] + 1
+        if content.startswith(';', stop):
+            stop += 1
+        spans[n] = [start, stop]
+    return spans
+
+
+def merge_ranges(ranges):
+    """重なる・隣接する [start, end) をまとめて昇順で返す"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def splice_out(content, ranges):
+    """マージ済みの範囲を取り除いた文字列を1回の結合で作る"""
+    parts = []
+    pos = 0
+    for start, end in ranges:
+        parts.append(content[pos:start])
+        pos = end
+    parts.append(content[pos:])
+    return ''.join(parts)
+
+
+def hash_line(line):
+    """行の内容ハッシュ（差分検出用、プロセスをまたいで安定）"""
+    return hashlib.blake2b(line.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class AnalysisCache:
+    """ファイルごとの分析結果をディスクに保存するキャッシュ
+
+    パターン集合のハッシュが変わった場合は全エントリを破棄する。
+    削除・改名されたファイルのエントリはprune()で取り除く（残すと際限なく増える）。
+    """
+
+    VERSION = 2
+
+    def __init__(self, path, pattern_hash):
+        self.path = Path(path)
+        self.pattern_hash = pattern_hash
+        self.entries = {}
+        self.seen = set()
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION and data.get("pattern_hash") == self.pattern_hash:
+            self.entries = data.get("files", {})
+
+    def get(self, key):
+        self.seen.add(key)
+        return self.entries.get(key)
+
+    def put(self, key, entry):
+        self.seen.add(key)
+        old = self.entries.get(key)
+        if old is None or old["content_hash"] != entry["content_hash"]:
+            self.entries[key] = entry
+            self.dirty = True
+
+    def prune(self, root=None):
+        """今回参照しなかったroot配下のエントリと、ファイルがもう無いエントリを削除する
+
+        rootを渡さなければファイルが無いエントリだけを削除する（単一ファイルモード用）。
+        """
+        prefix = os.path.join(str(Path(root).resolve()), '') if root is not None else None
+        for key in list(self.entries):
+            unseen = prefix is not None and key.startswith(prefix) and key not in self.seen
+            if unseen or not os.path.exists(key):
+                del self.entries[key]
+                self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps({
+            "version": self.VERSION,
+            "pattern_hash": self.pattern_hash,
+            "files": self.entries
+        }), encoding='utf-8')
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
 class WeightCodeAnalyzer:
     def __init__(self, index_file="index.html"):
         self.index_file = Path(index_file)
@@ -26,54 +329,236 @@ class WeightCodeAnalyzer:
             r'timing.*btn',     # timing buttons
             r'clothing.*btn',   # clothing buttons
         ]
-        
-    def analyze(self):
-        """index.htmlから体重関連コードを全検出"""
+        self._compile()
+
+    def _compile(self):
+        """パターンを一度だけコンパイル
+
+        大文字・小文字を区別しない検索は、本文を一度だけ小文字化して
+        小文字化したパターンを当てる方がre.IGNORECASEより大幅に速い。
+        小文字化で意味が変わるパターン（\\Aや\\Sなどの大文字エスケープ、後読み）は
+        従来どおり行ごとにre.IGNORECASEで検索する。
+        """
+        self._compiled = []
+        for pattern in self.weight_patterns:
+            if re.search(r'\\[A-Z]|\(\?<', pattern):
+                self._compiled.append((False, re.compile(pattern, re.IGNORECASE)))
+            else:
+                self._compiled.append((True, re.compile(pattern.lower(), re.MULTILINE)))
+        self._function_compiled = [
+            (re.compile(p.lower(), re.MULTILINE), re.compile(p, re.IGNORECASE | re.MULTILINE))
+            for p in FUNCTION_PATTERNS
+        ]
+
+    def analyze(self, cache=None):
+        """index.htmlから体重関連コードを全検出
+
+        cache（AnalysisCache）を渡すと前回の結果から差分だけを走査する。
+        """
         if not self.index_file.exists():
             return {"error": f"{self.index_file} not found"}
             
         content = self.index_file.read_text(encoding='utf-8')
+        if cache is None:
+            return self.analyze_content(content)
+        key = str(self.index_file.resolve())
+        result, entry = self.analyze_incremental(content, cache.get(key))
+        cache.put(key, entry)
+        return result
+
+    def analyze_content(self, content):
+        """文字列に対して分析を実行（結果の形式はanalyze()と同じ）"""
         lines = content.split('\n')
-        
+        starts = line_starts(content)
+        hits = self._scan_hits(content, lines, starts)
+        functions = self._find_functions(content, starts)
+        return self._build_result(lines, hits, functions)
+
+    def analyze_incremental(self, content, entry=None):
+        """キャッシュエントリを使って差分だけ再走査する
+
+        entryは前回のanalyze_incremental()が返したもの。
+        本文が同じなら走査せずに結果を組み立て、変わっていれば前回になかった
+        内容の行だけを走査する。戻り値は (結果, 新しいentry)。
+        """
+        lines = content.split('\n')
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        if entry and entry["content_hash"] == content_hash:
+            hits = {int(index): indices for index, indices in entry["hits"].items()}
+            return self._build_result(lines, hits, entry["functions"]), entry
+
+        line_hashes = [hash_line(line) for line in lines]
+        starts = line_starts(content)
+        if entry is None:
+            hits = self._scan_hits(content, lines, starts)
+        else:
+            # ヒットは行の内容だけで決まるので、前回と同じ内容の行は結果を再利用する
+            # （行の挿入・削除・移動があっても位置に関係なく再利用できる）
+            known = {line_hash: [] for line_hash in entry["line_hashes"]}
+            for index, indices in entry["hits"].items():
+                known[entry["line_hashes"][int(index)]] = indices
+            hits = {}
+            for index, line_hash in enumerate(line_hashes):
+                indices = known.get(line_hash)
+                if indices is None:
+                    indices = self._scan_line(lines[index])
+                if indices:
+                    hits[index] = indices
+        # 関数パターンは改行をまたいでマッチしうるので本文全体で検索する
+        functions = self._find_functions(content, starts)
+        new_entry = {
+            "content_hash": content_hash,
+            "line_hashes": line_hashes,
+            "hits": {str(index): indices for index, indices in hits.items()},
+            "functions": functions
+        }
+        return self._build_result(lines, hits, functions), new_entry
+
+    def pattern_hash(self):
+        """パターン集合のハッシュ（変わったらキャッシュを無効化する）"""
+        key = json.dumps([self.weight_patterns, FUNCTION_PATTERNS])
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _scan_hits(self, content, lines, starts):
+        """行番号(0始まり)→ヒットしたパターン番号のリスト"""
+        # パターンごとに本文全体を1回だけ走査し、ヒット位置をbisectで行番号に変換する
+        # （出力は行順・パターン順で従来と同一）
+        lowered = content.lower()
+        lowered_lines = lowered.split('\n')
+        lowered_starts = starts if len(lowered) == len(content) else line_starts(lowered)
+        hits = {}
+        for i, (whole, compiled) in enumerate(self._compiled):
+            if not whole:
+                for index, line in enumerate(lines):
+                    if compiled.search(line):
+                        hits.setdefault(index, []).append(i)
+                continue
+            pos = 0
+            while True:
+                match = compiled.search(lowered, pos)
+                if not match:
+                    break
+                index = bisect_right(lowered_starts, match.start()) - 1
+                line_end = lowered_starts[index] + len(lowered_lines[index])
+                # 改行をまたいだマッチはその行単独で再確認する
+                if match.end() <= line_end or compiled.search(lowered_lines[index]):
+                    hits.setdefault(index, []).append(i)
+                pos = line_end + 1
+        return {index: sorted(indices) for index, indices in hits.items()}
+
+    def _scan_line(self, line):
+        """1行だけを走査（_scan_hitsの1行分と同じ結果）"""
+        lowered = line.lower()
+        return [i for i, (whole, compiled) in enumerate(self._compiled)
+                if compiled.search(lowered if whole else line)]
+
+    def _find_functions(self, content, starts):
+        """関数ブロックの検出（マッチ行と、ブロック全体の範囲spanを求める）"""
+        # 小文字化で文字数が変わらなければ位置がそのまま使えるので小文字版で検索する
+        lowered = content.lower()
+        same_offsets = len(lowered) == len(content)
+        functions = []
+        positions = []
+        for pattern, (lowered_compiled, compiled) in zip(FUNCTION_PATTERNS, self._function_compiled):
+            matches = lowered_compiled.finditer(lowered) if same_offsets else compiled.finditer(content)
+            for match in matches:
+                line_num = bisect_right(starts, match.start())
+                functions.append({
+                    "line": line_num,
+                    "pattern": pattern,
+                    "match": content[match.start():match.end()]
+                })
+                positions.append(match.span())
+        for function, span in zip(functions, function_spans(content, positions)):
+            function["span"] = span
+            function["end_line"] = bisect_right(starts, span[1] - 1) if span else None
+        return functions
+
+    def _build_result(self, lines, hits, functions):
         results = {
             "total_lines": len(lines),
             "weight_related": [],
-            "functions_to_remove": [],
+            "functions_to_remove": list(functions),
             "variables_to_remove": [],
             "css_to_remove": []
         }
-        
-        # 各行をチェック
-        for line_num, line in enumerate(lines, 1):
-            for pattern in self.weight_patterns:
-                if re.search(pattern, line, re.IGNORECASE):
-                    results["weight_related"].append({
-                        "line": line_num,
-                        "content": line.strip(),
-                        "pattern": pattern
-                    })
-                    
-        # 関数ブロックの検出
-        function_patterns = [
-            r'window\.saveWeightData\s*=.*?\{',
-            r'window\.loadUserWeightData\s*=.*?\{',
-            r'function.*weight.*\(',
-            r'async.*weight.*\('
-        ]
-        
-        for pattern in function_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                start_pos = match.start()
-                line_num = content[:start_pos].count('\n') + 1
-                results["functions_to_remove"].append({
-                    "line": line_num,
-                    "pattern": pattern,
-                    "match": match.group()
+        for index in sorted(hits):
+            for i in hits[index]:
+                results["weight_related"].append({
+                    "line": index + 1,
+                    "content": lines[index].strip(),
+                    "pattern": self.weight_patterns[i]
                 })
-        
         return results
     
+    def removal_ranges(self, content, analysis_result=None, remove_functions=True):
+        """除去する範囲 [start, end) をまとめて計算する
+
+        CSSと変数はgenerate_removal_script()のsedと同じ結果になるよう行ごとに判定する
+        （CSS置換後の行が変数パターンに当たれば行ごと削除）。remove_functionsなら
+        functions_to_removeのspanで関数ブロック全体も除去する。
+        """
+        # 各パターンは改行をまたがないので本文全体を1回ずつ走査し、ヒットを行頭位置で振り分ける
+        # （ヒット数は少ないので行頭表は作らずrfind/findで行の範囲を求める）
+        css_by_line = {}
+        for match in CSS_REMOVE_PATTERN.finditer(content):
+            css_by_line.setdefault(content.rfind('\n', 0, match.start()) + 1, []).append(match.span())
+        deleted = set()
+        for pattern in VARIABLE_REMOVE_PATTERNS:
+            for match in pattern.finditer(content):
+                deleted.add(content.rfind('\n', 0, match.start()) + 1)
+        ranges = []
+        for begin, spans in css_by_line.items():
+            # CSS置換で行の内容が変わるので、変数パターンは置換後の行で判定し直す
+            end = content.find('\n', begin)
+            replaced = CSS_REMOVE_PATTERN.sub('', content[begin:len(content) if end == -1 else end])
+            if any(pattern.search(replaced) for pattern in VARIABLE_REMOVE_PATTERNS):
+                deleted.add(begin)
+            else:
+                deleted.discard(begin)
+                ranges.extend(spans)
+        for begin in deleted:
+            end = content.find('\n', begin)
+            ranges.append((begin, len(content) if end == -1 else end + 1))
+        if remove_functions:
+            if analysis_result is None:
+                analysis_result = self.analyze_content(content)
+            ranges.extend(tuple(function["span"]) for function in analysis_result["functions_to_remove"]
+                          if function.get("span"))
+        return merge_ranges(ranges)
+
+    def apply_removals(self, analysis_result=None, dry_run=False, backup=True, remove_functions=True):
+        """除去を1回の読み込みと1回の書き込みで適用する（sedスクリプトの代替）
+
+        dry_runなら書き込まずにunified diffを返す。backupならgenerate_removal_script()と
+        同じ名前のバックアップを読み込み済みの内容から書き出す。
+        analysis_resultはこのファイルの現在の内容に対する分析結果であること。
+        改行コードを変換しないようバイト列で読み書きする（CRLFのファイルもそのまま）。
+        """
+        raw = self.index_file.read_bytes()
+        content = raw.decode('utf-8')
+        ranges = self.removal_ranges(content, analysis_result, remove_functions)
+        updated = splice_out(content, ranges)
+        summary = {
+            "ranges": len(ranges),
+            "removed_chars": len(content) - len(updated),
+            "lines_before": content.count('\n') + 1,
+            "lines_after": updated.count('\n') + 1,
+        }
+        if dry_run:
+            summary["diff"] = ''.join(difflib.unified_diff(
+                content.splitlines(keepends=True), updated.splitlines(keepends=True),
+                fromfile=str(self.index_file), tofile=f"{self.index_file} (除去後)"))
+            return summary
+        if backup:
+            backup_file = self.index_file.with_name(self.index_file.name + '.pre-separation-backup')
+            backup_file.write_bytes(raw)
+            summary["backup"] = str(backup_file)
+        tmp = self.index_file.with_name(self.index_file.name + '.tmp')
+        tmp.write_bytes(updated.encode('utf-8'))
+        os.replace(tmp, self.index_file)
+        return summary
+
     def generate_removal_script(self, analysis_result):
         """除去スクリプト生成"""
         script_lines = [
@@ -113,9 +598,224 @@ class WeightCodeAnalyzer:
         
         return '\n'.join(script_lines)
 
+def collect_files(root, globs=TREE_GLOBS):
+    """rootから対象ファイルを重複なしで列挙（相対パス順）"""
+    root = Path(root)
+    found = set()
+    for pattern in globs:
+        for path in root.glob(pattern):
+            relative = path.relative_to(root)
+            if path.is_file() and not EXCLUDED_DIRS.intersection(relative.parts):
+                found.add(relative)
+    return sorted(found)
+
+
+_worker_analyzer = None
+
+
+def _init_worker():
+    """ワーカープロセスごとにパターンを一度だけコンパイル"""
+    global _worker_analyzer
+    _worker_analyzer = WeightCodeAnalyzer()
+
+
+def _analyze_file(path, entry=None):
+    """1ファイル分の分析（ワーカープロセスで実行）
+
+    戻り値は (結果, 新しいキャッシュエントリ)。
+    """
+    try:
+        content = Path(path).read_text(encoding='utf-8')
+    except (OSError, UnicodeDecodeError) as e:
+        return {"error": f"{path}: {e}"}, None
+    return _worker_analyzer.analyze_incremental(content, entry)
+
+
+def iter_tree_results(root, globs=TREE_GLOBS, workers=None, cache=None):
+    """ファイルごとの分析結果を (相対パス, 結果) で順に返す
+
+    workers=1ならプロセスを起動せずに順番に処理する。
+    cacheを渡すと前回のエントリをワーカーに渡し、更新されたエントリを書き戻す。
+    """
+    root = Path(root)
+    files = collect_files(root, globs)
+    paths = [str(root / relative) for relative in files]
+    keys = [str((root / relative).resolve()) for relative in files]
+    entries = [cache.get(key) if cache else None for key in keys]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(paths)))
+    if workers == 1:
+        _init_worker()
+        outputs = map(_analyze_file, paths, entries)
+        executor = None
+    else:
+        chunksize = max(1, len(paths) // (workers * 4))
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        outputs = executor.map(_analyze_file, paths, entries, chunksize=chunksize)
+    try:
+        for relative, key, (result, entry) in zip(files, keys, outputs):
+            if cache is not None and entry is not None:
+                cache.put(key, entry)
+            yield relative.as_posix(), result
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def merge_results(file_results):
+    """ファイルごとの結果をanalyze()と同じ形式に統合（各項目に"file"を付加）"""
+    merged = {
+        "total_lines": 0,
+        "files": [],
+        "errors": [],
+        "weight_related": [],
+        "functions_to_remove": [],
+        "variables_to_remove": [],
+        "css_to_remove": []
+    }
+    for name, result in file_results:
+        if "error" in result:
+            merged["errors"].append(result["error"])
+            continue
+        merged["files"].append(name)
+        merged["total_lines"] += result["total_lines"]
+        for key in ("weight_related", "functions_to_remove", "variables_to_remove", "css_to_remove"):
+            merged[key].extend(dict(item, file=name) for item in result[key])
+    return merged
+
+
+def analyze_tree(root, globs=TREE_GLOBS, workers=None, on_result=None, cache=None):
+    """ディレクトリ内の対象ファイルを並列に分析して統合結果を返す
+
+    on_resultを渡すとファイルごとの結果が出るたびに (相対パス, 結果) で呼ばれる。
+    """
+    def stream():
+        for name, result in iter_tree_results(root, globs, workers, cache):
+            if on_result:
+                on_result(name, result)
+            yield name, result
+    return merge_results(stream())
+
+
+def analyze_reference(analyzer, content):
+    """ベンチマーク用: 行×パターンごとにre.searchする従来方式"""
+    lines = content.split('\n')
+    results = []
+    for line_num, line in enumerate(lines, 1):
+        for pattern in analyzer.weight_patterns:
+            if re.search(pattern, line, re.IGNORECASE):
+                results.append({"line": line_num, "content": line.strip(), "pattern": pattern})
+    functions = []
+    for pattern in FUNCTION_PATTERNS:
+        for match in re.finditer(pattern, content, re.IGNORECASE | re.MULTILINE):
+            functions.append({
+                "line": content[:match.start()].count('\n') + 1,
+                "pattern": pattern,
+                "match": match.group()
+            })
+    return results, functions
+
+
+def benchmark(analyzer, repeat=20):
+    """従来方式と一括走査方式の実行時間を比較"""
+    content = analyzer.index_file.read_text(encoding='utf-8')
+    result = analyzer.analyze_content(content)
+    expected = analyze_reference(analyzer, content)
+    functions = [{key: f[key] for key in ("line", "pattern", "match")} for f in result["functions_to_remove"]]
+    assert (result["weight_related"], functions) == expected, "結果が一致しません"
+
+    timings = {}
+    for name, func in (("reference", lambda: analyze_reference(analyzer, content)),
+                       ("optimized", lambda: analyzer.analyze_content(content))):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+
+    print(f"ベンチマーク: {analyzer.index_file} ({result['total_lines']}行, {repeat}回平均)")
+    print(f"  従来方式:     {timings['reference']:.2f} ms")
+    print(f"  一括走査方式: {timings['optimized']:.2f} ms")
+    print(f"  高速化:       {timings['reference'] / timings['optimized']:.1f}x")
+    return timings
+
+
+def option_value(argv, name, default=None):
+    """--name VALUE 形式のオプション値を取得"""
+    if name in argv:
+        index = argv.index(name)
+        if index + 1 < len(argv):
+            return argv[index + 1]
+    return default
+
+
+def open_cache(output_dir, argv):
+    """CLI用のキャッシュ（--no-cacheで無効化、--cache PATHで場所を指定）"""
+    if '--no-cache' in argv:
+        return None
+    path = option_value(argv, '--cache', os.path.join(output_dir, CACHE_FILE))
+    return AnalysisCache(path, WeightCodeAnalyzer().pattern_hash())
+
+
+def run_tree(root, workers, cache=None):
+    """ディレクトリモード: ファイルごとに結果を表示しながら統合結果を保存"""
+    def report(name, result):
+        if "error" in result:
+            print(f"  ⚠️ {result['error']}")
+        else:
+            print(f"  {name}: {len(result['weight_related'])}箇所 / 関数{len(result['functions_to_remove'])}個")
+
+    start = time.perf_counter()
+    result = analyze_tree(root, workers=workers, on_result=report, cache=cache)
+    elapsed = time.perf_counter() - start
+    if cache is not None:
+        cache.prune(root)
+        cache.save()
+
+    print("体重関連コード分析結果（ディレクトリ）")
+    print(f"対象ファイル: {len(result['files'])}個 ({elapsed:.2f}秒)")
+    print(f"総行数: {result['total_lines']}")
+    print(f"体重関連コード: {len(result['weight_related'])}箇所")
+    print(f"関数ブロック: {len(result['functions_to_remove'])}個")
+
+    output_dir = OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    with open(f'{output_dir}weight_analysis_tree.json', 'w') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print("\n生成ファイル:")
+    print("- weight_analysis_tree.json (全ファイルの詳細分析結果)")
+    return result
+
+
 if __name__ == "__main__":
-    analyzer = WeightCodeAnalyzer()
-    result = analyzer.analyze()
+    import sys
+    jobs = option_value(sys.argv, '--jobs')
+    jobs = int(jobs) if jobs else None
+    cache = open_cache(OUTPUT_DIR, sys.argv)
+    tree_root = option_value(sys.argv, '--dir')
+    if tree_root:
+        run_tree(tree_root, jobs, cache)
+        sys.exit(0)
+    analyzer = WeightCodeAnalyzer(sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith('--') else "index.html")
+    if '--benchmark' in sys.argv:
+        benchmark(analyzer)
+        sys.exit(0)
+    result = analyzer.analyze(cache)
+    if cache is not None:
+        cache.prune()
+        cache.save()
+    if '--apply' in sys.argv or '--dry-run' in sys.argv:
+        dry_run = '--dry-run' in sys.argv
+        summary = analyzer.apply_removals(result, dry_run=dry_run,
+                                          remove_functions='--keep-functions' not in sys.argv)
+        if dry_run:
+            sys.stdout.write(summary["diff"])
+        print(f"除去範囲: {summary['ranges']}箇所 / {summary['removed_chars']}文字")
+        print(f"行数: {summary['lines_before']} → {summary['lines_after']}")
+        if not dry_run:
+            print(f"✅ バックアップ作成: {summary['backup']}")
+            print("🎯 体重関連コード除去完了")
+        sys.exit(0)
     
     print("体重関連コード分析結果")
     print(f"総行数: {result['total_lines']}")
@@ -123,8 +823,7 @@ if __name__ == "__main__":
     print(f"関数ブロック: {len(result['functions_to_remove'])}個")
     
     # 出力ディレクトリ作成
-    import os
-    output_dir = './tools/testing/analysis-results/'
+    output_dir = OUTPUT_DIR
     os.makedirs(output_dir, exist_ok=True)
     
     # 詳細結果をJSONで出力
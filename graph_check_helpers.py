@@ -0,0 +1,216 @@
+"""
+体重グラフ確認スクリプト共通ヘルパー
+固定のtime.sleepの代わりにアプリの状態を明示的に待つ
+"""
+
+import os
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+APP_URL = "http://localhost:8080"
+
+# 状態待ちのタイムアウト（秒）
+DEFAULT_TIMEOUT = 10
+
+# 手動ログインを待つ最大時間（秒）
+LOGIN_TIMEOUT = 300
+
+# 終了前に画面を開いたままにする秒数（確認用、既定は待たない）
+HOLD_SECONDS = float(os.environ.get("GRAPH_CHECK_HOLD", "0"))
+
+# updateChart / updateChartWithOffset を包み、描画のたびに
+# window.__weightChartRenderCount を増やして 'weightchart:rendered' を発火する。
+# テスト側でupdateChartを差し替えた後にもう一度実行すれば新しい関数を包み直す。
+CHART_HOOK_JS = """
+['updateChart', 'updateChartWithOffset'].forEach(name => {
+    const original = window[name];
+    if (typeof original !== 'function' || original.__renderHooked) {
+        return;
+    }
+    const hooked = function(...args) {
+        try {
+            return original.apply(this, args);
+        } finally {
+            window.__weightChartRenderCount = (window.__weightChartRenderCount || 0) + 1;
+            window.dispatchEvent(new CustomEvent('weightchart:rendered', {
+                detail: {fn: name, args: args, count: window.__weightChartRenderCount}
+            }));
+        }
+    };
+    hooked.__renderHooked = true;
+    window[name] = hooked;
+});
+window.__weightChartRenderCount = window.__weightChartRenderCount || 0;
+"""
+
+CHART_HOOK_SCRIPT = CHART_HOOK_JS + "return true;"
+
+# チャートのデータセット概要（各スクリプトで使っていた形式）
+CHART_SUMMARY_JS = """
+const chartSummary = () => {
+    const chart = window.WeightTab && window.WeightTab.weightChart;
+    if (!chart) {
+        return {exists: false, datasetCount: 0, datasets: []};
+    }
+    return {
+        exists: true,
+        datasetCount: chart.data.datasets.length,
+        datasets: chart.data.datasets.map(ds => ({
+            label: ds.label,
+            dataCount: ds.data.length,
+            borderDash: ds.borderDash || null
+        }))
+    };
+};
+"""
+
+DATASETS_SCRIPT = CHART_SUMMARY_JS + "return chartSummary();"
+
+# updateChart(days)を呼び、描画フックの発火と次フレームの描画を待って概要を返す
+# （差し替えられたupdateChartでも待てるよう、毎回フックを入れ直す）
+RENDER_CHART_SCRIPT = CHART_HOOK_JS + CHART_SUMMARY_JS + """
+const days = arguments[0];
+const offset = arguments[1];
+const via = arguments[2];
+const done = arguments[arguments.length - 1];
+const before = window.__weightChartRenderCount || 0;
+try {
+    if (offset !== null) {
+        window.updateChartWithOffset(days, offset);
+    } else {
+        window[via](days);
+    }
+} catch (error) {
+    done({error: String(error)});
+    return;
+}
+const wait = () => {
+    if ((window.__weightChartRenderCount || 0) > before) {
+        requestAnimationFrame(() => requestAnimationFrame(() => done(chartSummary())));
+    } else {
+        window.addEventListener('weightchart:rendered', wait, {once: true});
+    }
+};
+wait();
+"""
+
+
+def wait_for_js(driver, script, timeout=DEFAULT_TIMEOUT, message=""):
+    """scriptの戻り値が真になるまで待ち、その値を返す"""
+    return WebDriverWait(driver, timeout, poll_frequency=0.05).until(
+        lambda d: d.execute_script(script), message)
+
+
+def open_app(driver, url=APP_URL, timeout=DEFAULT_TIMEOUT):
+    """アプリを開き、読み込み完了を待つ"""
+    driver.get(url)
+    wait_for_js(driver, "return document.readyState === 'complete'", timeout,
+                "ページの読み込みが完了しません")
+
+
+def simulate_login(driver, timeout=DEFAULT_TIMEOUT):
+    """ログイン状態をシミュレートし、メイン画面の表示を待つ"""
+    driver.execute_script("""
+        window.currentUser = {email: 'test@example.com', uid: 'test123'};
+        const modal = document.querySelector('.auth-modal');
+        if (modal) modal.style.display = 'none';
+        const main = document.querySelector('.main-container');
+        if (main) main.style.display = 'block';
+        if (typeof initializeTabs === 'function') {
+            initializeTabs();
+        }
+    """)
+    wait_for_js(driver, """
+        const main = document.querySelector('.main-container');
+        return !!window.currentUser && (!main || main.style.display !== 'none');
+    """, timeout, "ログイン状態になりません")
+
+
+def wait_for_popup(driver, timeout=2):
+    """ログイン用の別ウィンドウが開くのを待つ（開かなければFalse）"""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(lambda d: len(d.window_handles) > 1)
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_for_login(driver, timeout=LOGIN_TIMEOUT):
+    """手動ログインの完了（window.currentUserの設定）を待つ"""
+    wait_for_js(driver, "return !!window.currentUser", timeout, "ログインが完了しません")
+
+
+def show_weight_tab(driver, timeout=DEFAULT_TIMEOUT):
+    """体重タブを表示し、タブのJSとグラフ要素の準備を待つ"""
+    driver.execute_script("""
+        if (typeof showTab === 'function') showTab(1);
+        else if (typeof switchTab === 'function') switchTab(1);
+    """)
+    wait_for_weight_tab(driver, timeout)
+
+
+def wait_for_weight_tab(driver, timeout=DEFAULT_TIMEOUT):
+    """体重タブのJS読み込みとグラフ要素の準備を待ち、描画フックを入れる"""
+    wait_for_js(driver, """
+        return !!window.WeightTab && typeof window.updateChart === 'function'
+            && !!document.getElementById('weightChart');
+    """, timeout, "体重タブが準備できません")
+    install_chart_hook(driver)
+
+
+def init_weight_tab(driver, timeout=DEFAULT_TIMEOUT):
+    """initWeightTab()を実行し、入力欄の初期化を待つ"""
+    driver.execute_script("if (typeof initWeightTab === 'function') initWeightTab();")
+    wait_for_js(driver, """
+        const input = document.getElementById('dateInput');
+        return !!input && !!input.value;
+    """, timeout, "体重タブの初期化が完了しません")
+
+
+def install_chart_hook(driver):
+    """updateChartに描画完了フックを入れる（差し替え後は呼び直す）"""
+    driver.execute_script(CHART_HOOK_SCRIPT)
+
+
+def wait_for_chart(driver, timeout=DEFAULT_TIMEOUT):
+    """WeightTab.weightChartにデータセットができるまで待つ"""
+    wait_for_js(driver, """
+        const chart = window.WeightTab && window.WeightTab.weightChart;
+        return !!chart && chart.data.datasets.length > 0;
+    """, timeout, "グラフが描画されません")
+
+
+def render_chart(driver, days, offset=None, via="updateChart", timeout=DEFAULT_TIMEOUT):
+    """updateChart(days)を実行し、描画完了後のデータセット概要を返す
+
+    viaで呼ぶ関数を変えられる（期間ボタンと同じ経路ならupdateChartRange）。
+    offsetを指定するとupdateChartWithOffset(days, offset)を呼ぶ。
+    """
+    driver.set_script_timeout(timeout)
+    result = driver.execute_async_script(RENDER_CHART_SCRIPT, days, offset, via)
+    if result and "error" in result:
+        raise RuntimeError(f"{via}({days})でエラー: {result['error']}")
+    return result
+
+
+def chart_datasets(driver):
+    """現在のグラフのデータセット概要"""
+    return driver.execute_script(DATASETS_SCRIPT)
+
+
+def click_and_wait_render(driver, element, timeout=DEFAULT_TIMEOUT):
+    """ボタンをクリックし、それによるグラフ描画を待つ"""
+    before = driver.execute_script("return window.__weightChartRenderCount || 0")
+    element.click()
+    wait_for_js(driver, f"return (window.__weightChartRenderCount || 0) > {before}", timeout,
+                "クリック後にグラフが描画されません")
+
+
+def hold_for_viewing(seconds=None):
+    """確認用に画面を開いたままにする（GRAPH_CHECK_HOLD秒、既定0）"""
+    seconds = HOLD_SECONDS if seconds is None else seconds
+    if seconds > 0:
+        print(f"\n⏳ {seconds:g}秒後に自動で閉じます...")
+        time.sleep(seconds)
@@ -0,0 +1,205 @@
+"""
+体重グラフのシナリオ一括プローブ
+データ投入・各期間のupdateChart・データセット取得・コンソールログ収集を
+1回のexecute_async_scriptで実行し、結果を1つのJSONで受け取る
+"""
+
+import base64
+from pathlib import Path
+
+from graph_check_helpers import CHART_HOOK_JS, CHART_SUMMARY_JS, DEFAULT_TIMEOUT
+
+# 1期間あたりの描画待ちを見込んだスクリプトタイムアウト（秒）
+PER_PERIOD_TIMEOUT = 2
+
+# シナリオ全体をブラウザ内で実行する。
+# arguments[0] = {data, setup, periods, via, offset, detail, logs, snapshots, measure}
+PROBE_SCRIPT = CHART_SUMMARY_JS + """
+const scenario = arguments[0];
+const done = arguments[arguments.length - 1];
+
+const nextFrame = () => new Promise(resolve =>
+    requestAnimationFrame(() => requestAnimationFrame(resolve)));
+
+// 描画フックの発火（同期的に描画された場合は即座）を待つ
+const waitRender = before => new Promise(resolve => {
+    const check = () => {
+        if ((window.__weightChartRenderCount || 0) > before) {
+            resolve();
+        } else {
+            window.addEventListener('weightchart:rendered', check, {once: true});
+        }
+    };
+    check();
+});
+
+// 期間ごとにconsole出力を集める（終わったら元に戻す）
+const captured = [];
+const levels = ['log', 'info', 'warn', 'error'];
+const originals = {};
+const captureConsole = () => levels.forEach(level => {
+    originals[level] = console[level];
+    console[level] = function(...args) {
+        captured.push({level: level, message: args.map(String).join(' ')});
+        return originals[level].apply(this, args);
+    };
+});
+const restoreConsole = () => levels.forEach(level => {
+    if (originals[level]) console[level] = originals[level];
+});
+
+// measure指定時: メインスレッドのロングタスク（50ms超）とJSヒープを記録する
+const longTasks = [];
+const observer = scenario.measure && typeof PerformanceObserver === 'function'
+    && (PerformanceObserver.supportedEntryTypes || []).includes('longtask')
+    ? new PerformanceObserver(list => longTasks.push(...list.getEntries())) : null;
+const heapUsed = () => performance.memory ? performance.memory.usedJSHeapSize : null;
+const longTasksBetween = (start, end) => {
+    if (!observer) return null;
+    longTasks.push(...observer.takeRecords());
+    const tasks = longTasks.filter(task => task.startTime + task.duration > start && task.startTime < end);
+    return {
+        count: tasks.length,
+        totalMs: tasks.reduce((sum, task) => sum + task.duration, 0),
+        maxMs: tasks.reduce((max, task) => Math.max(max, task.duration), 0)
+    };
+};
+
+const dataInfo = () => {
+    const data = (window.WeightTab && window.WeightTab.allWeightData) || [];
+    const grouped = {};
+    data.forEach(entry => {
+        (grouped[entry.date] = grouped[entry.date] || []).push(entry.value || entry.weight);
+    });
+    const multiple = Object.entries(grouped)
+        .filter(([, values]) => values.length > 1)
+        .map(([date, values]) => ({date: date, count: values.length, values: values}));
+    return {totalCount: data.length, uniqueDays: Object.keys(grouped).length,
+            multipleMeasurementDays: multiple};
+};
+
+const detailOf = chart => chart.data.datasets.map(ds => {
+    const value = v => v instanceof Date ? v.toISOString() : v;
+    const point = p => p === undefined ? null
+        : (typeof p === 'object' ? {x: value(p.x), y: p.y} : {x: null, y: p});
+    return {
+        label: ds.label,
+        dataCount: ds.data.length,
+        borderDash: ds.borderDash || null,
+        borderColor: ds.borderColor || null,
+        firstData: point(ds.data[0]),
+        lastData: point(ds.data[ds.data.length - 1])
+    };
+});
+
+const hookChart = () => {
+""" + CHART_HOOK_JS + """
+};
+
+const run = async () => {
+    const result = {setup: null, data: null, setupLogs: [], periods: []};
+    if (scenario.logs) captureConsole();
+    if (observer) observer.observe({type: 'longtask'});
+    try {
+        if (scenario.setup) {
+            result.setup = new Function(scenario.setup)();
+        }
+        if (scenario.data !== null) {
+            window.WeightTab.allWeightData = scenario.data;
+        }
+        result.data = dataInfo();
+        if (scenario.measure) result.data.heapUsed = heapUsed();
+        result.setupLogs = captured.splice(0);
+
+        // setupでupdateChartが差し替えられていても待てるよう包み直す
+        hookChart();
+        // データ投入とdataInfo()のタスクを1期間目のロングタスクに数えないよう区切る
+        if (scenario.measure) await nextFrame();
+
+        for (const days of scenario.periods) {
+            const entry = {days: days, error: null};
+            const before = window.__weightChartRenderCount || 0;
+            const heapBefore = scenario.measure ? heapUsed() : null;
+            const started = performance.now();
+            try {
+                if (scenario.offset !== null) {
+                    window.updateChartWithOffset(days, scenario.offset);
+                } else {
+                    window[scenario.via](days);
+                }
+                await waitRender(before);
+            } catch (error) {
+                entry.error = String(error);
+            }
+            entry.elapsedMs = performance.now() - started;
+            await nextFrame();
+            // 描画（アニメーションの最初のフレーム）まで含めた時間
+            entry.settledMs = performance.now() - started;
+            if (scenario.measure) {
+                entry.longTasks = longTasksBetween(started, performance.now());
+                entry.heap = {before: heapBefore, after: heapUsed()};
+            }
+
+            const chart = window.WeightTab && window.WeightTab.weightChart;
+            Object.assign(entry, chartSummary());
+            if (chart && scenario.detail) {
+                entry.datasets = detailOf(chart);
+            }
+            if (chart && scenario.snapshots.includes(days)) {
+                // アニメーション途中ではなく最終状態を画像にする
+                chart.update('none');
+                entry.snapshot = chart.canvas.toDataURL('image/png');
+            }
+            entry.logs = captured.splice(0);
+            result.periods.push(entry);
+        }
+    } finally {
+        if (observer) observer.disconnect();
+        restoreConsole();
+    }
+    return result;
+};
+
+run().then(done, error => done({error: String(error)}));
+"""
+
+
+def run_probe(driver, periods, data=None, setup=None, via="updateChart", offset=None,
+              detail=False, logs=False, snapshots=(), measure=False, timeout=None):
+    """シナリオを1回のラウンドトリップで実行し、結果のJSONを返す
+
+    data: WeightTab.allWeightDataに入れるデータ（Noneなら今のデータのまま）
+    setup: 最初に実行するJS（関数本体。updateChartの差し替えなど）
+    periods: 順に描画する期間（updateChartのdays）のリスト
+    detail: データセットの色・最初と最後の点も取得する
+    logs: 期間ごとのconsole出力を集める
+    snapshots: グラフのcanvasをPNG（data URL）で取得する期間
+    measure: 期間ごとのロングタスクとJSヒープ（performance.memory）も記録する
+    """
+    scenario = {
+        "data": data,
+        "setup": setup,
+        "periods": list(periods),
+        "via": via,
+        "offset": offset,
+        "detail": detail,
+        "logs": logs,
+        "snapshots": list(snapshots),
+        "measure": measure,
+    }
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT + PER_PERIOD_TIMEOUT * len(scenario["periods"])
+    driver.set_script_timeout(timeout)
+    result = driver.execute_async_script(PROBE_SCRIPT, scenario)
+    if result and "error" in result:
+        raise RuntimeError(f"プローブの実行でエラー: {result['error']}")
+    return result
+
+
+def save_snapshot(entry, path):
+    """期間の結果に含まれるグラフ画像をPNGファイルに保存する（画像がなければFalse）"""
+    snapshot = entry.get("snapshot")
+    if not snapshot:
+        return False
+    Path(path).write_bytes(base64.b64decode(snapshot.split(",", 1)[1]))
+    return True
@@ -0,0 +1,109 @@
+"""
+体重グラフ期間マトリクスのpytest設定
+
+ワーカープロセス（pytest-xdistの -n）ごとにbrowser_pool.SessionPoolで
+ヘッドレスChromeを1つ起動し、ログイン・タブ初期化済みのセッションを全テストで使い回す。
+アプリはGRAPH_APP_URLが未指定ならワーカーごとに静的サーバーを立てて配信する。
+"""
+
+import json
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def pytest_addoption(parser):
+    parser.addoption("--graph-json", default=None,
+                     help="テスト結果のJSONサマリーの出力先")
+    parser.addoption("--headed", action="store_true",
+                     help="ヘッドレスではなく画面付きでChromeを起動する")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def app_url():
+    """テスト対象のURL（未指定ならリポジトリを配信する静的サーバーを起動）"""
+    url = os.environ.get("GRAPH_APP_URL")
+    if url:
+        yield url
+        return
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(REPO_ROOT)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/index.html"
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def session_pool(request, app_url):
+    """このワーカー専用のウォーム済みブラウザ（ログイン・体重タブ初期化済み）"""
+    pytest.importorskip("selenium")
+    from browser_pool import SessionPool
+
+    # テストデータの日付はUTC基準なのでブラウザのタイムゾーンも固定する
+    pool = SessionPool(1, url=app_url, headless=not request.config.getoption("--headed"),
+                       data=[], timezone="UTC")
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def weight_page(session_pool):
+    """テストごとにグラフ関連の状態だけを戻したセッション"""
+    with session_pool.session() as driver:
+        yield driver
+
+
+class GraphSummary:
+    """テスト結果を集めてJSONサマリーを書くプラグイン
+
+    xdist使用時はコントローラー側に全ワーカーの結果が届くので、そこで書き出す。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.results = []
+        self.started = time.time()
+
+    def pytest_runtest_logreport(self, report):
+        if report.when != "call" and not (report.failed or report.skipped):
+            return
+        node = getattr(report, "node", None)
+        self.results.append({
+            "nodeid": report.nodeid,
+            "outcome": report.outcome,
+            "phase": report.when,
+            "duration": round(report.duration, 4),
+            "worker": node.workerinput["workerid"] if hasattr(node, "workerinput") else None,
+            "message": report.longrepr.reprcrash.message
+            if report.failed and hasattr(report.longrepr, "reprcrash") else None,
+        })
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        summary = {
+            "wall_time": round(time.time() - self.started, 3),
+            "exitstatus": int(exitstatus),
+            "counts": {outcome: sum(1 for r in self.results if r["outcome"] == outcome)
+                       for outcome in ("passed", "failed", "skipped")},
+            "results": self.results,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def pytest_configure(config):
+    path = config.getoption("--graph-json")
+    # xdistのワーカーでは書かない
+    if path and not hasattr(config, "workerinput"):
+        config.pluginmanager.register(GraphSummary(path), "graph_summary")
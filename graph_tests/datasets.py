@@ -0,0 +1,62 @@
+"""
+体重グラフテスト用のデータセットと期待値
+日付は実行日（UTC）からの相対日数で作る（ブラウザ側もUTCに固定する）
+"""
+
+from datetime import datetime, timedelta, timezone
+
+# テスト対象の期間（updateChartのdays）
+PERIODS = [1, 7, 30, 90, 365, 0]
+
+# データセット名 → [(何日前, 時刻, 体重)]
+# 期間の境界（ちょうどdays日前）を避けて、結果が実行時刻に依存しないようにしている
+DATASETS = {
+    # 複数測定の日と単一測定の日が混在
+    "mixed": [
+        (500, "08:00", 75.1), (500, "21:00", 75.8),
+        (200, "07:30", 74.0),
+        (45, "08:00", 73.4), (45, "20:00", 73.9),
+        (10, "08:00", 72.8),
+        (3, "07:00", 72.5), (3, "12:00", 72.9), (3, "22:00", 73.2),
+        (0, "08:00", 72.3), (0, "20:00", 72.7),
+    ],
+    # 1日1回のみ（最大値・最小値データセットは出ない）
+    "single_per_day": [(day, "08:00", 70.0 + day / 10) for day in range(40, -1, -2)],
+    # 過去のデータのみ（直近の期間は空）
+    "old_only": [(400, "08:00", 80.0), (400, "20:00", 80.6), (380, "08:00", 79.5)],
+    "empty": [],
+}
+
+
+def build_entries(rows, today=None):
+    """(何日前, 時刻, 体重)のリストをWeightTab.allWeightData形式に変換（古い順）"""
+    today = today or datetime.now(timezone.utc).date()
+    entries = [
+        {"date": (today - timedelta(days=days_ago)).isoformat(), "time": time, "value": value}
+        for days_ago, time, value in rows
+    ]
+    return sorted(entries, key=lambda entry: (entry["date"], entry["time"]))
+
+
+def expected_chart(rows, days):
+    """updateChart(days)の結果として期待するデータセット概要
+
+    グラフが作られない場合はNone、作られる場合は [(label, 件数, 破線か)]。
+    """
+    if days == 0:
+        included = list(rows)
+    else:
+        # 0日前〜days-1日前が期間内（days日前はその日の0時UTC < 開始時刻なので期間外）
+        included = [row for row in rows if row[0] < days]
+    if not included:
+        return None
+    if days == 1:
+        return [("体重", len(included), False)]
+    per_day = {}
+    for days_ago, _, _ in included:
+        per_day[days_ago] = per_day.get(days_ago, 0) + 1
+    expected = [("平均値", len(per_day), False)]
+    multiple = sum(1 for count in per_day.values() if count > 1)
+    if multiple:
+        expected += [("最大値", multiple, True), ("最小値", multiple, True)]
+    return expected
@@ -0,0 +1,90 @@
+"""
+体重グラフのベンチマーク用合成データ生成
+シードを固定すれば同じデータになる（日付は実行日（UTC）から遡る）
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+# 測定タイミング → (基準時刻(時), 体重の補正kg)。アプリのタイミングボタンと同じ名前
+TIMINGS = {
+    "起床後": (6.5, -0.4),
+    "トイレ前": (7.0, 0.0),
+    "トイレ後": (7.2, -0.3),
+    "食事前": (12.0, 0.1),
+    "食事後": (12.8, 0.6),
+    "風呂前": (21.0, 0.3),
+    "風呂後": (21.5, 0.1),
+}
+
+# 服装 → 体重の補正kg（アプリの上半身・下半身ボタンと同じ名前）
+CLOTHING_TOP = {"なし": 0.0, "下着シャツ": 0.1, "ワイシャツ": 0.2}
+CLOTHING_BOTTOM = {"なし": 0.0, "トランクス": 0.05, "ハーフパンツ": 0.25}
+
+# 既定の出現比率（朝晩の2回測定が中心）
+DEFAULT_TIMING_MIX = {"起床後": 6, "トイレ後": 2, "食事後": 1, "風呂後": 4}
+DEFAULT_CLOTHING_MIX = {("なし", "トランクス"): 5, ("下着シャツ", "トランクス"): 3,
+                        ("下着シャツ", "ハーフパンツ"): 2, ("ワイシャツ", "ハーフパンツ"): 1}
+
+
+def _pick(rng, mix):
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+def generate_entries(days=365, entries_per_day=2, timing_mix=None, clothing_mix=None,
+                     seed=0, start_weight=72.0, skip_rate=0.0, today=None):
+    """days日分の体重データをWeightTab.allWeightData形式で生成（古い順）
+
+    entries_per_day: 1日の測定回数（int、または(最小, 最大)のタプル）
+    timing_mix: {タイミング: 比率}、clothing_mix: {(上, 下): 比率}
+    skip_rate: 測定しない日の割合
+    """
+    rng = random.Random(seed)
+    timing_mix = timing_mix or DEFAULT_TIMING_MIX
+    clothing_mix = clothing_mix or DEFAULT_CLOTHING_MIX
+    today = today or datetime.now(timezone.utc).date()
+    low, high = entries_per_day if isinstance(entries_per_day, tuple) else (entries_per_day,) * 2
+
+    entries = []
+    weight = start_weight
+    for days_ago in range(days - 1, -1, -1):
+        # 日ごとの体重はゆるやかなランダムウォーク
+        weight += rng.gauss(0, 0.15) + (start_weight - weight) * 0.01
+        if rng.random() < skip_rate:
+            continue
+        date = (today - timedelta(days=days_ago)).isoformat()
+        for _ in range(rng.randint(low, high)):
+            timing = _pick(rng, timing_mix)
+            top, bottom = _pick(rng, clothing_mix)
+            hour, offset = TIMINGS[timing]
+            minutes = min(max(int(hour * 60 + rng.gauss(0, 20)), 0), 24 * 60 - 1)
+            value = weight + offset + CLOTHING_TOP[top] + CLOTHING_BOTTOM[bottom] + rng.gauss(0, 0.1)
+            entries.append({
+                "date": date,
+                "time": f"{minutes // 60:02d}:{minutes % 60:02d}",
+                "value": round(value, 1),
+                "timing": timing,
+                "clothing": {"top": top, "bottom": bottom},
+                "memo": "",
+            })
+    return sorted(entries, key=lambda entry: (entry["date"], entry["time"]))
+
+
+def entries_for_count(count, entries_per_day=2, seed=0, **options):
+    """ちょうどcount件になるよう、直近からの日数を決めて生成する
+
+    1日0件や全日スキップでは件数が増えず終わらないのでValueErrorにする。
+    """
+    low, high = entries_per_day if isinstance(entries_per_day, tuple) else (entries_per_day,) * 2
+    if not 1 <= low <= high:
+        raise ValueError(f"entries_per_dayは1以上にしてください: {entries_per_day!r}")
+    skip_rate = options.get("skip_rate", 0.0)
+    if not 0 <= skip_rate < 1:
+        raise ValueError(f"skip_rateは0以上1未満にしてください: {skip_rate!r}")
+    per_day = (low + high) / 2
+    days = int(count / per_day) + 1
+    entries = generate_entries(days, entries_per_day, seed=seed, **options)
+    while len(entries) < count:
+        days *= 2
+        entries = generate_entries(days, entries_per_day, seed=seed, **options)
+    return entries[-count:]
@@ -0,0 +1,34 @@
+"""
+体重グラフの期間 × データセット × 呼び出し経路のマトリクステスト
+
+  python -m pytest graph_tests -n auto --junitxml=graph_tests/results/junit.xml \
+      --graph-json=graph_tests/results/summary.json
+"""
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from datasets import DATASETS, PERIODS, build_entries, expected_chart  # noqa: E402
+from graph_check_helpers import render_chart  # noqa: E402
+
+# 呼び出し経路: updateChart直接（quick_graph_check.py相当）と期間ボタンの処理
+SCRIPTS = ["updateChart", "updateChartRange"]
+
+
+@pytest.mark.parametrize("script", SCRIPTS)
+@pytest.mark.parametrize("dataset", list(DATASETS))
+@pytest.mark.parametrize("days", PERIODS)
+def test_period(weight_page, days, dataset, script):
+    rows = DATASETS[dataset]
+    weight_page.execute_script("window.WeightTab.allWeightData = arguments[0];", build_entries(rows))
+
+    result = render_chart(weight_page, days, via=script)
+
+    expected = expected_chart(rows, days)
+    if expected is None:
+        assert not result["exists"], f"データがないのにグラフがある: {result['datasets']}"
+        return
+    assert result["exists"], "グラフが作成されていない"
+    actual = [(ds["label"], ds["dataCount"], bool(ds["borderDash"])) for ds in result["datasets"]]
+    assert actual == expected
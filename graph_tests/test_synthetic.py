@@ -0,0 +1,52 @@
+"""
+合成データ生成（synthetic.py）のテスト（ブラウザ不要）
+"""
+
+from datetime import date
+
+import pytest
+
+from synthetic import CLOTHING_BOTTOM, CLOTHING_TOP, TIMINGS, entries_for_count, generate_entries
+
+TODAY = date(2026, 1, 31)
+
+
+def test_same_seed_same_data():
+    assert generate_entries(60, seed=1, today=TODAY) == generate_entries(60, seed=1, today=TODAY)
+    assert generate_entries(60, seed=1, today=TODAY) != generate_entries(60, seed=2, today=TODAY)
+
+
+def test_entries_match_app_format():
+    entries = generate_entries(30, entries_per_day=(1, 3), today=TODAY)
+    assert entries == sorted(entries, key=lambda entry: (entry["date"], entry["time"]))
+    assert entries[-1]["date"] <= TODAY.isoformat()
+    for entry in entries:
+        assert entry["timing"] in TIMINGS
+        assert entry["clothing"]["top"] in CLOTHING_TOP
+        assert entry["clothing"]["bottom"] in CLOTHING_BOTTOM
+        assert len(entry["time"]) == 5 and isinstance(entry["value"], float)
+
+
+def test_mix_and_skip_rate():
+    entries = generate_entries(100, entries_per_day=1, timing_mix={"風呂後": 1},
+                               clothing_mix={("なし", "なし"): 1}, skip_rate=0.5, today=TODAY)
+    assert 20 < len(entries) < 80
+    assert {entry["timing"] for entry in entries} == {"風呂後"}
+    assert {(entry["clothing"]["top"], entry["clothing"]["bottom"]) for entry in entries} == {("なし", "なし")}
+
+
+def test_entries_for_count_is_exact():
+    for count in (1, 999, 1000):
+        entries = entries_for_count(count, today=TODAY)
+        assert len(entries) == count
+        assert entries[-1]["date"] == TODAY.isoformat()
+    assert len(entries_for_count(500, entries_per_day=(1, 2), skip_rate=0.3, today=TODAY)) == 500
+
+
+@pytest.mark.parametrize("options", [
+    {"skip_rate": 1.0}, {"skip_rate": -0.1}, {"entries_per_day": 0}, {"entries_per_day": (0, 0)},
+    {"entries_per_day": (3, 1)},
+])
+def test_entries_for_count_rejects_options_that_never_reach_count(options):
+    with pytest.raises(ValueError):
+        entries_for_count(10, today=TODAY, **options)
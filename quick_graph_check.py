@@ -2,52 +2,20 @@
 体重グラフの直接確認（JavaScriptで直接実行）
 """
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-import time
 import sys
 
+from browser_pool import start_browser
+from graph_check_helpers import render_chart, hold_for_viewing
+
 sys.stdout.reconfigure(encoding='utf-8')
 
 def quick_check():
-    driver = webdriver.Chrome()
+    # ログイン状態のシミュレートと体重タブの初期化まで済ませたブラウザ
+    print("📊 アプリケーションを開いています（ログイン・体重タブ初期化込み）...")
+    driver = start_browser("http://localhost:8080/index.html")
     
     try:
-        print("📊 アプリケーションを開いています...")
-        driver.get("http://localhost:8080/index.html")
-        time.sleep(3)
-        
-        # デバッグ用：JavaScriptでログイン状態をシミュレート
-        print("\n🔧 ログイン状態をシミュレート...")
-        driver.execute_script("""
-            // ログイン状態をシミュレート
-            window.currentUser = {email: 'test@example.com', uid: 'test123'};
-            
-            // タブボタンを表示
-            document.querySelector('.auth-modal').style.display = 'none';
-            document.querySelector('.main-container').style.display = 'block';
-            
-            // タブシステムを初期化
-            if (typeof initializeTabs === 'function') {
-                initializeTabs();
-            }
-        """)
-        time.sleep(2)
-        
-        # 体重タブを表示
-        print("\n📊 体重タブを表示...")
-        driver.execute_script("showTab(1)")
-        time.sleep(2)
-        
-        # 体重タブの初期化を強制実行
-        print("\n🔧 体重タブを初期化...")
-        driver.execute_script("""
-            if (typeof initWeightTab === 'function') {
-                initWeightTab();
-            }
-        """)
-        time.sleep(2)
-        
         # テストデータを挿入
         print("\n📊 テストデータを挿入...")
         driver.execute_script("""
@@ -81,27 +49,8 @@ def quick_check():
         for days, name in periods:
             print(f"\n🔄 {name}表示をテスト...")
             
-            # updateChartを実行
-            driver.execute_script(f"updateChart({days})")
-            time.sleep(1)
-            
-            # グラフの状態を確認
-            result = driver.execute_script("""
-                if (window.WeightTab && window.WeightTab.weightChart) {
-                    const datasets = window.WeightTab.weightChart.data.datasets;
-                    return {
-                        exists: true,
-                        datasetCount: datasets.length,
-                        datasets: datasets.map(ds => ({
-                            label: ds.label,
-                            dataCount: ds.data.length,
-                            borderDash: ds.borderDash || null
-                        }))
-                    };
-                } else {
-                    return {exists: false};
-                }
-            """)
+            # updateChartを実行し、描画完了後のグラフの状態を確認
+            result = render_chart(driver, days)
             
             if result['exists']:
                 print(f"  ✅ グラフ存在: データセット数 = {result['datasetCount']}")
@@ -122,9 +71,7 @@ def quick_check():
         driver.save_screenshot("weight_graph_test_result.png")
         print("\n📸 スクリーンショット保存: weight_graph_test_result.png")
         
-        # 10秒待機
-        print("\n⏳ 10秒後に自動で閉じます...")
-        time.sleep(10)
+        hold_for_viewing()
         
     except Exception as e:
         print(f"\n❌ エラー: {str(e)}")
@@ -2,55 +2,28 @@
 体重グラフの修正を実行して確認
 """
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
-import time
 import sys
 
+from browser_pool import start_browser
+from graph_check_helpers import render_chart, hold_for_viewing
+from graph_tests.datasets import DATASETS, build_entries
+
 sys.stdout.reconfigure(encoding='utf-8')
 
-def main():
+def main(manual=False):
     print("=== 体重グラフ修正テスト ===\n")
     
-    # コンソールログを有効化
-    caps = DesiredCapabilities.CHROME
-    caps['goog:loggingPrefs'] = {'browser': 'ALL'}
-    
-    options = webdriver.ChromeOptions()
-    options.set_capability('goog:loggingPrefs', {'browser': 'ALL'})
-    
-    driver = webdriver.Chrome(options=options)
+    # コンソールログ有効・ログイン・体重タブ初期化済みのブラウザ
+    # （既定はログインをシミュレート、--manual-login で手動ログインを待つ）
+    print("📊 アプリケーションを開いています...")
+    if manual:
+        print("⏳ 手動でログインしてください（完了を自動検出します）...")
+        driver = start_browser(manual=True)
+    else:
+        # シミュレート時はFirebaseのデータがないので、複数測定の日を含むテストデータを入れる
+        driver = start_browser(data=build_entries(DATASETS["mixed"]))
     
     try:
-        print("📊 アプリケーションを開いています...")
-        driver.get("http://localhost:8080")
-        time.sleep(3)
-        
-        # Googleログイン
-        print("\n🔐 Googleログインボタンをクリック...")
-        try:
-            login_btn = driver.find_element(By.XPATH, "//button[contains(., 'Google')]")
-            login_btn.click()
-            time.sleep(2)
-            
-            # ウィンドウを切り替え
-            windows = driver.window_handles
-            if len(windows) > 1:
-                driver.switch_to.window(windows[0])
-                print("ℹ️ メインウィンドウに戻りました")
-        except:
-            print("⚠️ ログインボタンが見つかりません")
-        
-        # ログイン完了を待つ（手動ログインの場合）
-        print("\n⏳ 手動でログインしてください（15秒待機）...")
-        time.sleep(15)
-        
-        # 体重タブに切り替え
-        print("\n📊 体重タブに切り替え...")
-        driver.execute_script("if (typeof showTab === 'function') showTab(1)")
-        time.sleep(2)
-        
         # 修正版のupdateChart関数を注入
         print("\n🔧 修正版updateChart関数を注入...")
         update_chart_code = """
@@ -262,28 +235,16 @@ return true;
         
         for days, name in periods:
             print(f"\n🔄 {name}表示をテスト...")
-            driver.execute_script(f"updateChart({days})")
-            time.sleep(1)
+            # 描画完了まで待ってデータセット情報を取得
+            dataset_info = render_chart(driver, days)['datasets']
             
             # コンソールログ確認
             print_console_logs()
             
-            # データセット情報を取得
-            dataset_info = driver.execute_script("""
-                if (window.WeightTab && window.WeightTab.weightChart) {
-                    return window.WeightTab.weightChart.data.datasets.map(ds => ({
-                        label: ds.label,
-                        dataCount: ds.data.length,
-                        hasDash: ds.borderDash ? true : false
-                    }));
-                }
-                return null;
-            """)
-            
             if dataset_info:
                 print(f"\n  📊 データセット情報:")
                 for ds in dataset_info:
-                    dash = " (破線)" if ds['hasDash'] else ""
+                    dash = " (破線)" if ds['borderDash'] else ""
                     print(f"     - {ds['label']}: {ds['dataCount']}件{dash}")
             
             # スクリーンショット
@@ -292,8 +253,7 @@ return true;
                 print(f"  📸 スクリーンショット保存: weight_graph_{name}.png")
         
         print("\n✅ テスト完了！")
-        print("\n⏳ 10秒後に自動で閉じます...")
-        time.sleep(10)
+        hold_for_viewing()
         
     except Exception as e:
         print(f"\n❌ エラー: {str(e)}")
@@ -304,4 +264,4 @@ return true;
         print("\n✅ ブラウザを閉じました")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(manual="--manual-login" in sys.argv)
\ No newline at end of file
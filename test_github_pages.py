@@ -10,6 +10,9 @@ from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 import time
 import sys
 
+from graph_check_helpers import show_weight_tab, wait_for_chart
+from graph_probe import run_probe, save_snapshot
+
 sys.stdout.reconfigure(encoding='utf-8')
 
 def main():
@@ -98,46 +101,13 @@ def main():
         
         # 体重タブに切り替え
         print("\n📊 体重タブに切り替えています...")
-        tab_result = driver.execute_script("""
-            if (typeof showTab === 'function') {
-                showTab(1);
-                return true;
-            } else {
-                // タブボタンを直接クリック
-                const tabBtn = document.getElementById('tab1');
-                if (tabBtn) {
-                    tabBtn.click();
-                    return true;
-                }
-                return false;
-            }
-        """)
-        
-        if tab_result:
-            print("✅ 体重タブに切り替えました")
-        else:
-            print("❌ 体重タブへの切り替えに失敗")
+        show_weight_tab(driver)
+        print("✅ 体重タブに切り替えました")
         
-        time.sleep(3)
+        # Firebaseのデータ読み込み後の初回描画を待つ
+        wait_for_chart(driver)
         
-        # データの状態を確認
-        print("\n📊 データ状態を確認...")
-        data_info = driver.execute_script("""
-            if (window.WeightTab && window.WeightTab.allWeightData) {
-                return {
-                    exists: true,
-                    count: window.WeightTab.allWeightData.length,
-                    hasChart: window.WeightTab.weightChart ? true : false
-                };
-            }
-            return {exists: false};
-        """)
-        
-        print(f"  WeightTabオブジェクト: {data_info.get('exists', False)}")
-        print(f"  データ数: {data_info.get('count', 0)}件")
-        print(f"  グラフ存在: {data_info.get('hasChart', False)}")
-        
-        # 各期間でテスト
+        # 各期間でテスト（描画・データセット取得・ログ収集を1回のスクリプト実行で行う）
         periods = [
             (1, "1日"),
             (7, "1週間"),
@@ -146,89 +116,49 @@ def main():
             (365, "1年"),
             (0, "全期間")
         ]
+        result = run_probe(driver, [days for days, _ in periods], logs=True, snapshots=[7])
         
-        for days, name in periods:
-            print(f"\n🔄 {name}表示をテスト...")
-            
-            # updateChartを実行
-            update_result = driver.execute_script(f"""
-                if (typeof updateChart === 'function') {{
-                    updateChart({days});
-                    return true;
-                }}
-                return false;
-            """)
+        # データの状態を確認
+        print("\n📊 データ状態を確認...")
+        print(f"  データ数: {result['data']['totalCount']}件")
+        print(f"  複数測定日数: {len(result['data']['multipleMeasurementDays'])}日")
+        
+        for (days, name), entry in zip(periods, result['periods']):
+            print(f"\n🔄 {name}表示をテスト... ({entry['elapsedMs']:.1f}ms)")
             
-            if not update_result:
-                print("  ❌ updateChart関数が見つかりません")
+            if entry['error']:
+                print(f"  ❌ updateChartでエラー: {entry['error']}")
                 continue
             
-            time.sleep(2)
-            
-            # グラフの状態を確認
-            chart_info = driver.execute_script("""
-                if (window.WeightTab && window.WeightTab.weightChart) {
-                    const datasets = window.WeightTab.weightChart.data.datasets;
-                    return {
-                        exists: true,
-                        datasetCount: datasets.length,
-                        datasets: datasets.map(ds => ({
-                            label: ds.label,
-                            dataCount: ds.data.length,
-                            hasDash: ds.borderDash ? true : false
-                        }))
-                    };
-                }
-                return {exists: false};
-            """)
-            
-            if chart_info['exists']:
+            if entry['exists']:
                 print(f"  ✅ グラフ表示成功")
-                print(f"  データセット数: {chart_info['datasetCount']}")
-                for ds in chart_info['datasets']:
-                    dash = " (破線)" if ds['hasDash'] else ""
+                print(f"  データセット数: {entry['datasetCount']}")
+                for ds in entry['datasets']:
+                    dash = " (破線)" if ds['borderDash'] else ""
                     print(f"    - {ds['label']}: {ds['dataCount']}件{dash}")
             else:
                 print("  ❌ グラフが表示されていません")
             
             # コンソールログを確認
-            logs = driver.get_log('browser')
-            has_debug_logs = False
-            for log in logs[-10:]:
-                if '🔴' in log['message']:
-                    has_debug_logs = True
-                    print(f"  [LOG] {log['message']}")
+            debug_logs = [log['message'] for log in entry['logs'] if '🔴' in log['message']]
+            for message in debug_logs[-10:]:
+                print(f"  [LOG] {message}")
             
-            if has_debug_logs:
+            if debug_logs:
                 print("  ✅ 修正版のデバッグログを確認！")
             
-            # 1週間表示でスクリーンショット
-            if days == 7:
-                driver.save_screenshot("github_pages_test_1week.png")
-                print("  📸 スクリーンショット保存: github_pages_test_1week.png")
+            # 1週間表示でグラフ画像を保存
+            if save_snapshot(entry, "github_pages_test_1week.png"):
+                print("  📸 グラフ画像保存: github_pages_test_1week.png")
         
-        # 最大値・最小値の表示を確認
+        # 最大値・最小値の表示を確認（最後に描画した全期間のグラフ）
         print("\n📊 最大値・最小値表示の確認...")
-        final_check = driver.execute_script("""
-            if (window.WeightTab && window.WeightTab.weightChart) {
-                const datasets = window.WeightTab.weightChart.data.datasets;
-                const hasMax = datasets.some(ds => ds.label === '最大値');
-                const hasMin = datasets.some(ds => ds.label === '最小値');
-                const hasAvg = datasets.some(ds => ds.label === '平均値');
-                
-                return {
-                    hasMaxMin: hasMax && hasMin,
-                    hasAvg: hasAvg,
-                    details: datasets.map(ds => ds.label)
-                };
-            }
-            return null;
-        """)
-        
-        if final_check:
-            print(f"  平均値表示: {'✅' if final_check['hasAvg'] else '❌'}")
-            print(f"  最大値・最小値表示: {'✅' if final_check['hasMaxMin'] else '❌'}")
-            print(f"  全データセット: {final_check['details']}")
+        final = result['periods'][-1]
+        if final['exists']:
+            labels = [ds['label'] for ds in final['datasets']]
+            print(f"  平均値表示: {'✅' if '平均値' in labels else '❌'}")
+            print(f"  最大値・最小値表示: {'✅' if '最大値' in labels and '最小値' in labels else '❌'}")
+            print(f"  全データセット: {labels}")
         
         print("\n✅ テスト完了！")
         print("\n⏳ 20秒後に自動で閉じます...")